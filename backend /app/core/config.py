@@ -16,6 +16,15 @@ class Settings(BaseSettings):
     MYSQL_DB: str = os.getenv("MYSQL_DB", "invoice_db")
     MYSQL_PORT: str = os.getenv("MYSQL_PORT", "3306")
     SQLALCHEMY_DATABASE_URI: str = f"mysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_SERVER}:{MYSQL_PORT}/{MYSQL_DB}"
+    # Local mode for tests/dev: path to a SQLite file used instead of MySQL
+    DB_SQLITE_PATH: str = os.getenv("DB_SQLITE_PATH", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Recycle before MySQL's wait_timeout drops idle connections, instead of
+    # paying a pre-ping round trip on every checkout
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -27,6 +36,100 @@ class Settings(BaseSettings):
 
     # LLM
     GITHUB_INFERENCE_API_KEY: str = os.getenv("GITHUB_INFERENCE_API_KEY", "")
+    LLM_POOL_MAX_CONNECTIONS: int = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+    LLM_POOL_MAX_KEEPALIVE: int = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+    LLM_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+    LLM_CONNECT_TIMEOUT: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    LLM_READ_TIMEOUT: float = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    # Circuit breaker per backend: opens after N consecutive errors or slow calls
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+    LLM_BREAKER_SLOW_SECONDS: float = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "60"))
+    LLM_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+    # auto mode: also send to the fallback once the primary passes its p95
+    LLM_HEDGE: bool = os.getenv("LLM_HEDGE", "false").lower() == "true"
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+    LLM_HEDGE_DEFAULT_DELAY: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "15"))
+    # Process-wide limits per backend; 0 requests/tokens per minute = unlimited
+    LLM_GITHUB_MAX_IN_FLIGHT: int = int(os.getenv("LLM_GITHUB_MAX_IN_FLIGHT", "4"))
+    LLM_GITHUB_RPM: int = int(os.getenv("LLM_GITHUB_RPM", "0"))
+    LLM_GITHUB_TPM: int = int(os.getenv("LLM_GITHUB_TPM", "0"))
+    LLM_OLLAMA_MAX_IN_FLIGHT: int = int(os.getenv("LLM_OLLAMA_MAX_IN_FLIGHT", "2"))
+    LLM_OLLAMA_RPM: int = int(os.getenv("LLM_OLLAMA_RPM", "0"))
+    LLM_OLLAMA_TPM: int = int(os.getenv("LLM_OLLAMA_TPM", "0"))
+    # llama3.2-vision takes one image per message; batched calls skip Ollama unless set
+    LLM_OLLAMA_MULTI_IMAGE: bool = os.getenv("LLM_OLLAMA_MULTI_IMAGE", "false").lower() == "true"
+    # Retries for 429/5xx answers; Retry-After wins over the jittered backoff
+    LLM_RETRY_MAX: int = int(os.getenv("LLM_RETRY_MAX", "3"))
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+
+    # OCR jobs
+    OCR_MAX_WORKERS: int = int(os.getenv("OCR_MAX_WORKERS", "4"))
+    OCR_MAX_QUEUED_JOBS: int = int(os.getenv("OCR_MAX_QUEUED_JOBS", "32"))
+    # Engines loaded in the background at startup: comma list, "all" or empty
+    OCR_WARMUP_ENGINES: str = os.getenv("OCR_WARMUP_ENGINES", "")
+    # Documents of a single request extracted in parallel
+    OCR_DOCUMENT_CONCURRENCY: int = int(os.getenv("OCR_DOCUMENT_CONCURRENCY", "4"))
+    # Scanned-PDF page LLM calls in flight across the whole process
+    OCR_PAGE_CONCURRENCY: int = int(os.getenv("OCR_PAGE_CONCURRENCY", "8"))
+
+    # PDF rasterization
+    OCR_PDF_DPI: int = int(os.getenv("OCR_PDF_DPI", "300"))
+    OCR_PDF_MIN_DPI: int = int(os.getenv("OCR_PDF_MIN_DPI", "100"))
+    OCR_PDF_MAX_PAGES: int = int(os.getenv("OCR_PDF_MAX_PAGES", "50"))
+    # Process-wide budget for rasterized pages held at once (shared by all
+    # requests); a page larger than its share: downgrade | reject
+    OCR_RASTER_MAX_MB: int = int(os.getenv("OCR_RASTER_MAX_MB", "512"))
+    OCR_RASTER_OVERSIZE: str = os.getenv("OCR_RASTER_OVERSIZE", "downgrade").lower()
+
+    # Searchable PDFs: text-layer engine (pdfium | pdfplumber; layout-sensitive
+    # doc types always use pdfplumber), pages read and text sent to the LLM
+    OCR_PDF_TEXT_ENGINE: str = os.getenv("OCR_PDF_TEXT_ENGINE", "pdfium").lower()
+    OCR_PDF_TEXT_MAX_PAGES: int = int(os.getenv("OCR_PDF_TEXT_MAX_PAGES", "50"))
+    OCR_PDF_TEXT_MAX_TOKENS: int = int(os.getenv("OCR_PDF_TEXT_MAX_TOKENS", "24000"))
+    # Pages with less text than this are treated as scanned and sent as images
+    OCR_PDF_TEXT_MIN_CHARS: int = int(os.getenv("OCR_PDF_TEXT_MIN_CHARS", "32"))
+
+    # Local OCR + validators for ID cards before (or instead of) the LLM
+    OCR_FAST_PATH: bool = os.getenv("OCR_FAST_PATH", "false").lower() == "true"
+    OCR_FAST_PATH_MIN_CONFIDENCE: float = float(os.getenv("OCR_FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+    # Pack several images of one document into a single LLM call
+    OCR_BATCH_IMAGES: bool = os.getenv("OCR_BATCH_IMAGES", "false").lower() == "true"
+    OCR_BATCH_MAX_IMAGES: int = int(os.getenv("OCR_BATCH_MAX_IMAGES", "4"))
+    OCR_BATCH_MAX_BYTES: int = int(os.getenv("OCR_BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+    # Decoded documents accepted by one /api/v1/ocr/extract/* request
+    OCR_EXTRACT_MAX_BYTES: int = int(os.getenv("OCR_EXTRACT_MAX_BYTES", str(50 * 1024 * 1024)))
+    # Items accepted by one /api/v1/ocr/batch request
+    OCR_BATCH_MAX_ITEMS: int = int(os.getenv("OCR_BATCH_MAX_ITEMS", "50"))
+
+    # URL documents: streamed download cap, per-host concurrency, and an
+    # optional disk cache revalidated by ETag/Last-Modified (empty dir = off)
+    OCR_FETCH_MAX_BYTES: int = int(os.getenv("OCR_FETCH_MAX_BYTES", str(10 * 1024 * 1024)))
+    OCR_FETCH_TIMEOUT: float = float(os.getenv("OCR_FETCH_TIMEOUT", "30"))
+    OCR_FETCH_MAX_PER_HOST: int = int(os.getenv("OCR_FETCH_MAX_PER_HOST", "8"))
+    OCR_FETCH_CACHE_DIR: str = os.getenv("OCR_FETCH_CACHE_DIR", "")
+    OCR_FETCH_CACHE_MAX_MB: int = int(os.getenv("OCR_FETCH_CACHE_MAX_MB", "1024"))
+
+    # Image normalization before vision-LLM calls
+    OCR_IMAGE_MAX_SIDE: int = int(os.getenv("OCR_IMAGE_MAX_SIDE", "2048"))
+    OCR_IMAGE_JPEG_QUALITY: int = int(os.getenv("OCR_IMAGE_JPEG_QUALITY", "85"))
+    # Upright images in a supported format below this size are sent untouched
+    OCR_IMAGE_PASSTHROUGH_BYTES: int = int(os.getenv("OCR_IMAGE_PASSTHROUGH_BYTES", str(512 * 1024)))
+
+    # Extraction result cache (OCR_CACHE_DIR empty = memory only)
+    OCR_CACHE_ENABLED: bool = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_MAX_ENTRIES: int = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "1024"))
+    OCR_CACHE_DIR: str = os.getenv("OCR_CACHE_DIR", "")
+    OCR_CACHE_TTL_SECONDS: int = int(os.getenv("OCR_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+    # Per-request profiling: X-Profile header / ?profile=1 returns a stage
+    # timeline; a sampled fraction of requests is cProfiled into OCR_PROFILE_DIR.
+    # The flag exposes internals to any caller, so operators turn it on
+    OCR_PROFILE_ALLOW_FLAG: bool = os.getenv("OCR_PROFILE_ALLOW_FLAG", "false").lower() == "true"
+    OCR_PROFILE_DIR: str = os.getenv("OCR_PROFILE_DIR", "")
+    OCR_PROFILE_SAMPLE_RATE: float = float(os.getenv("OCR_PROFILE_SAMPLE_RATE", "0"))
 
     class Config:
         case_sensitive = True
@@ -1,13 +1,113 @@
+import threading
+import time
+from typing import Any, Dict, Tuple
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+
+def _database_urls() -> Tuple[str, str]:
+    """(sync URL, async URL) for the configured database."""
+    if settings.DB_SQLITE_PATH:
+        return f"sqlite:///{settings.DB_SQLITE_PATH}", f"sqlite+aiosqlite:///{settings.DB_SQLITE_PATH}"
+    uri = settings.SQLALCHEMY_DATABASE_URI
+    return uri, uri.replace("mysql://", "mysql+aiomysql://", 1)
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+_SYNC_URL, _ASYNC_URL = _database_urls()
+
+engine = create_engine(_SYNC_URL, **_engine_options(_SYNC_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Created on first use so the async driver is only needed by async callers
+_async_engine = None
+_async_session_factory = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(_ASYNC_URL, **_engine_options(_ASYNC_URL))
+                _async_session_factory = async_sessionmaker(
+                    _async_engine, autoflush=False, expire_on_commit=False
+                )
+    return _async_engine
+
+
+# ----------------------------
+# Pool checkout metrics
+# ----------------------------
+class _PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def observe(self, wait_ms: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 3),
+            }
+
+
+_sync_metrics = _PoolMetrics()
+_async_metrics = _PoolMetrics()
+
+
+def pool_stats() -> Dict[str, Any]:
+    stats = {"sync": {**_sync_metrics.snapshot(), "pool": engine.pool.status()}}
+    if _async_engine is not None:
+        stats["async"] = {**_async_metrics.snapshot(), "pool": _async_engine.pool.status()}
+    return stats
+
+
 def get_db():
     db = SessionLocal()
     try:
+        # Check out eagerly so the wait for a pooled connection is measured
+        started = time.perf_counter()
+        db.connection()
+        _sync_metrics.observe((time.perf_counter() - started) * 1000)
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_session_factory() as db:
+        started = time.perf_counter()
+        await db.connection()
+        _async_metrics.observe((time.perf_counter() - started) * 1000)
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
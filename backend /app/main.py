@@ -1,17 +1,41 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Depends, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.datastructures import UploadFile as FormFile
 from typing import Optional, List, Dict, Any
+import asyncio
 import json
 import base64
-import requests
-import os
 import uuid
+import threading
+import math
 from pathlib import Path
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import local modules
 # We assume ocr_extractor is in app/services/ocr_extractor.py
-from app.services.ocr_extractor import _extract_from_bytes, _clean_gpt_json
+from app.services.ocr_extractor import _clean_gpt_json, _merge_pages, is_supported_doc_type
+from app.services.job_service import (
+    run_extraction, run_file_extraction, run_batch_extraction, stream_file_extraction,
+    submit_job, get_job, JobQueueFull
+)
+from app.services.upload_service import save_upload, UploadSizeLimit, UploadTooLarge
+from app.services.document_ingest import read_binary, read_json_documents, upload_filename
+from app.services.http_clients import close_clients
+from app.services.url_fetcher import FetchSession, close_fetch_clients
+from app.services.extraction_cache import extraction_cache
+from app.services.llm_limiter import LLMRateLimited, limiter_stats
+from app.services.llm_routing import breaker_stats
+from app.services import metrics, profiling
+from app.services.metrics import stage
+from app.services import engines
+from app.db.base_class import Base
+from app.db.session import engine, get_async_db, pool_stats, dispose_async_engine
+from app.core.config import settings
+from app.schemas.invoice import InvoiceUpload, JobStatus, InvoiceList, InvoiceResponse
+from app.services.document_service import list_documents, get_document, InvalidCursor
 
 app = FastAPI(
     title="Neura API",
@@ -28,316 +52,635 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cap upload bodies before they are parsed: by Content-Length up front, and
+# while streaming for bodies without one
+_UPLOAD_PATHS = ("/api/v1/ocr/upload/", "/api/v1/ocr/stream/", "/api/v1/ocr/jobs")
+# JSON and raw /extract bodies are bounded while they are decoded; multipart
+# ones are spooled by Starlette first, so they are capped here
+_EXTRACT_PATHS = ("/api/v1/ocr/extract/",)
+# Allowance for multipart boundaries and form fields around the file
+_MULTIPART_OVERHEAD = 64 * 1024
+
+def _profile_requested(request: Request) -> bool:
+    if not settings.OCR_PROFILE_ALLOW_FLAG:
+        return False
+    flag = request.headers.get("x-profile") or request.query_params.get("profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """
+    Collect a stage timeline for OCR requests that ask for one (X-Profile
+    header or ?profile=1) or are sampled. Requested timelines are returned in
+    a Server-Timing header and, for JSON object bodies, under "_profile";
+    sampled ones are only written to OCR_PROFILE_DIR.
+    """
+    if not request.url.path.startswith("/api/v1/ocr/"):
+        return await call_next(request)
+    requested = _profile_requested(request)
+    sampled = profiling.should_sample()
+    if not requested and not sampled:
+        return await call_next(request)
+
+    timeline = profiling.Timeline(sample=sampled)
+    with profiling.activate(timeline):
+        response = await call_next(request)
+    if sampled:
+        await run_in_threadpool(profiling.write_timeline, timeline, request.url.path)
+    if not requested:
+        return response
+
+    summary = timeline.summary()
+    response.headers["Server-Timing"] = profiling.server_timing(summary)
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return Response(content=body, status_code=response.status_code, headers=headers)
+    data["_profile"] = summary
+    return JSONResponse(content=data, status_code=response.status_code, headers=headers)
+
+# Added last so it is the outermost middleware and rejects before the others
+# see the body
+app.add_middleware(UploadSizeLimit, max_bytes=settings.MAX_UPLOAD_SIZE + _MULTIPART_OVERHEAD, paths=_UPLOAD_PATHS)
+app.add_middleware(UploadSizeLimit, max_bytes=settings.OCR_EXTRACT_MAX_BYTES + _MULTIPART_OVERHEAD,
+                   paths=_EXTRACT_PATHS, content_types=("multipart/form-data",))
+
 # Create uploads directory if it doesn't exist
 UPLOADS_DIR = Path("uploads")
 UPLOADS_DIR.mkdir(exist_ok=True)
 
+@app.on_event("startup")
+def create_tables():
+    # Job state lives in the invoices table
+    try:
+        Base.metadata.create_all(bind=engine)
+    except Exception as e:
+        print(f"Database unavailable, OCR jobs disabled: {e}")
+
+def _warmup_engine_names() -> List[str]:
+    names = settings.OCR_WARMUP_ENGINES.strip()
+    if names == "all":
+        return list(engines.engine_status())
+    return [n.strip() for n in names.split(",") if n.strip()]
+
+@app.on_event("startup")
+def warmup_engines():
+    # Load in the background so "/" is served while Paddle initializes
+    names = _warmup_engine_names()
+    if names:
+        threading.Thread(target=engines.warmup, args=(names,), daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_http_clients():
+    await close_clients()
+    await close_fetch_clients()
+    await dispose_async_engine()
+
 @app.get("/")
 async def root():
     return {"message": "Neura API is running"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Which engines are loaded and how long each took; 503 until the engines
+    listed in OCR_WARMUP_ENGINES are loaded.
+    """
+    status = engines.engine_status()
+    is_ready = all(status[name]["loaded"] for name in _warmup_engine_names() if name in status)
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "engines": status}
+    )
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Pipeline stage latencies, LLM latencies and error counts in Prometheus text format.
+    """
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/v1/db/pool/stats")
+async def db_pool_stats():
+    """
+    Connection pool state and how long requests waited to check out a connection.
+    """
+    return pool_stats()
+
+@app.get("/api/v1/ocr/cache/stats")
+async def ocr_cache_stats():
+    """
+    Extraction cache hit/miss counters; every hit is an LLM call saved.
+    """
+    return extraction_cache.stats()
+
+@app.get("/api/v1/llm/backends")
+async def llm_backends():
+    """
+    Circuit breaker state and latency percentiles for each LLM backend.
+    """
+    return breaker_stats()
+
+@app.get("/api/v1/llm/limits")
+async def llm_limits():
+    """
+    Per-backend LLM limiter state: in-flight calls, queue depth, wait times and retries.
+    """
+    return limiter_stats()
+
 # ========================================
 # File Upload Endpoints
 # ========================================
-@app.post("/api/v1/ocr/upload/pan")
-async def upload_pan(file: UploadFile = File(...)):
+async def _upload_and_extract(file: UploadFile, prefix: str, doc_type: str):
     """
-    Upload PAN card image, save to uploads folder, and extract data.
+    Stream the upload into the uploads folder, then extract data from the
+    saved file.
     """
     try:
-        # Read file bytes
-        file_bytes = await file.read()
-        
         # Generate unique filename
         file_extension = Path(file.filename).suffix or ".jpg"
-        unique_filename = f"pan_{uuid.uuid4().hex[:8]}{file_extension}"
+        unique_filename = f"{prefix}_{uuid.uuid4().hex[:8]}{file_extension}"
         file_path = UPLOADS_DIR / unique_filename
-        
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(file_bytes)
-        
+
+        # Save file, enforcing the size limit while streaming
+        _, file_digest = await save_upload(file, file_path, settings.MAX_UPLOAD_SIZE)
+
         # Extract data
-        result = _extract_from_bytes(file_bytes, file.filename, "ind_pan")
-        
+        result = await run_file_extraction(str(file_path), file.filename, doc_type, file_digest)
+
         # Parse JSON if it's a string
         if isinstance(result, str):
             cleaned = _clean_gpt_json(result)
             data = json.loads(cleaned)
         else:
             data = result
-        
+
         return {
             "success": True,
             "file_path": str(file_path),
             "data": data
         }
+    except UploadTooLarge as e:
+        return JSONResponse(
+            status_code=413,
+            content={"success": False, "error": str(e)}
+        )
+    except JobQueueFull as e:
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": str(e)}
+        )
+    except LLMRateLimited as e:
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after is not None else None
+        return JSONResponse(
+            status_code=429,
+            content={"success": False, "error": str(e)},
+            headers=headers
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": str(e)}
         )
 
+@app.post("/api/v1/ocr/upload/pan")
+async def upload_pan(file: UploadFile = File(...)):
+    """
+    Upload PAN card image, save to uploads folder, and extract data.
+    """
+    return await _upload_and_extract(file, "pan", "ind_pan")
+
 @app.post("/api/v1/ocr/upload/ind_aadhaar")
 async def upload_aadhaar(file: UploadFile = File(...)):
     """
     Upload Aadhaar card image, save to uploads folder, and extract data.
     """
-    try:
-        # Read file bytes
-        file_bytes = await file.read()
-        
-        # Generate unique filename
-        file_extension = Path(file.filename).suffix or ".jpg"
-        unique_filename = f"aadhaar_{uuid.uuid4().hex[:8]}{file_extension}"
-        file_path = UPLOADS_DIR / unique_filename
-        
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(file_bytes)
-        
-        # Extract data
-        result = _extract_from_bytes(file_bytes, file.filename, "ind_aadhaar")
-        
-        # Parse JSON if it's a string
-        if isinstance(result, str):
-            cleaned = _clean_gpt_json(result)
-            data = json.loads(cleaned)
-        else:
-            data = result
-        
-        return {
-            "success": True,
-            "file_path": str(file_path),
-            "data": data
-        }
-    except Exception as e:
-        return JSONResponse(
-            status_code=500,
-            content={"success": False, "error": str(e)}
-        )
+    return await _upload_and_extract(file, "aadhaar", "ind_aadhaar")
 
 @app.post("/api/v1/ocr/upload/voterid")
 async def upload_voterid(file: UploadFile = File(...)):
     """
     Upload Voter ID image, save to uploads folder, and extract data.
     """
+    return await _upload_and_extract(file, "voterid", "ind_voterid")
+
+# ========================================
+# Streaming Endpoints
+# ========================================
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _upload_and_stream(file: UploadFile, prefix: str, doc_type: str):
+    """
+    Save the upload like _upload_and_extract, then stream the extraction as
+    Server-Sent Events: a "field" event per completed (masked) field, then
+    "done" with the full result, or "error".
+    """
+    file_extension = Path(file.filename).suffix or ".jpg"
+    file_path = UPLOADS_DIR / f"{prefix}_{uuid.uuid4().hex[:8]}{file_extension}"
     try:
-        # Read file bytes
-        file_bytes = await file.read()
-        
-        # Generate unique filename
-        file_extension = Path(file.filename).suffix or ".jpg"
-        unique_filename = f"voterid_{uuid.uuid4().hex[:8]}{file_extension}"
-        file_path = UPLOADS_DIR / unique_filename
-        
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(file_bytes)
-        
-        # Extract data
-        result = _extract_from_bytes(file_bytes, file.filename, "ind_voterid")
-        
-        # Parse JSON if it's a string
-        if isinstance(result, str):
-            cleaned = _clean_gpt_json(result)
-            data = json.loads(cleaned)
-        else:
-            data = result
-        
-        return {
-            "success": True,
-            "file_path": str(file_path),
-            "data": data
-        }
-    except Exception as e:
-        return JSONResponse(
-            status_code=500,
-            content={"success": False, "error": str(e)}
-        )
+        _, file_digest = await save_upload(file, file_path, settings.MAX_UPLOAD_SIZE)
+        events = stream_file_extraction(str(file_path), file.filename, doc_type, file_digest)
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"success": False, "error": str(e)})
+    except JobQueueFull as e:
+        return JSONResponse(status_code=503, content={"success": False, "error": str(e)})
 
-@app.post("/api/v1/ocr/extract/pan")
-async def extract_ind_pan(payload: dict = Body(...)):
+    async def sse():
+        async for event in events:
+            name = "error" if "error" in event else "done" if event.get("done") else "field"
+            yield _sse(name, event)
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        # Proxies must not buffer, or fields arrive all at once at the end
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/v1/ocr/stream/pan")
+async def stream_pan(file: UploadFile = File(...)):
     """
-    Extract PAN data.
+    Upload a PAN card and receive the extracted fields as Server-Sent Events.
     """
-    documents = payload.get("documents")
-    if not isinstance(documents, list) or not documents:
-        raise HTTPException(status_code=400, detail="documents must be a non-empty list")
-    
-    merged_result: Dict[str, Any] = {}
+    return await _upload_and_stream(file, "pan", "ind_pan")
 
-    for doc in documents:
-        try:
-            # --- URL ---
-            if doc.startswith("http://") or doc.startswith("https://"):
-                resp = requests.get(doc, stream=True, timeout=60)
-                resp.raise_for_status()
-                filename = doc.split("/")[-1].split("?")[0]
-                file_bytes = resp.content
-                detected_type = "ind_pan"
-                result = _extract_from_bytes(file_bytes, filename, detected_type)
-
-            # --- Base64 ---
-            else:
-                b64_part = doc.split(",", 1)[1] if doc.startswith("data:") else doc
-                file_bytes = base64.b64decode(b64_part)
-                filename = "upload.jpg"
-                detected_type = "ind_pan"
-                result = _extract_from_bytes(file_bytes, filename, detected_type)
-
-            # Merge results - _extract_from_bytes returns a JSON string
-            if isinstance(result, str):
-                try:
-                    cleaned = _clean_gpt_json(result)
-                    parsed = json.loads(cleaned)
-                    if isinstance(parsed, dict):
-                        merged_result.update(parsed)
-                except json.JSONDecodeError as e:
-                    merged_result["error"] = f"JSON parse error: {e}"
-                    merged_result["raw"] = result
-            elif isinstance(result, dict):
-                merged_result.update(result)
-            elif isinstance(result, list):
-                 # Handle list return if any
-                 for r in result:
-                    if isinstance(r, dict):
-                        merged_result.update(r)
-                    elif isinstance(r, str):
-                        try:
-                            cleaned = _clean_gpt_json(r)
-                            parsed = json.loads(cleaned)
-                            if isinstance(parsed, dict):
-                                merged_result.update(parsed)
-                        except Exception:
-                            pass
+@app.post("/api/v1/ocr/stream/ind_aadhaar")
+async def stream_aadhaar(file: UploadFile = File(...)):
+    """
+    Upload an Aadhaar card and receive the extracted fields as Server-Sent Events.
+    """
+    return await _upload_and_stream(file, "aadhaar", "ind_aadhaar")
 
-        except Exception as e:
-            merged_result["error"] = str(e)
+@app.post("/api/v1/ocr/stream/voterid")
+async def stream_voter_id(file: UploadFile = File(...)):
+    """
+    Upload a Voter ID card and receive the extracted fields as Server-Sent Events.
+    """
+    return await _upload_and_stream(file, "voterid", "ind_voterid")
 
-    return {"results": merged_result}
+# ========================================
+# Extract Endpoints
+# ========================================
+# Raw bodies accepted by /extract/* as a single document
+_BINARY_TYPES = ("application/octet-stream", "application/pdf")
+
+# The handlers read the body themselves, so describe it for the OpenAPI docs
+_EXTRACT_BODY = {"requestBody": {"required": True, "content": {
+    "application/json": {"schema": {
+        "type": "object",
+        "properties": {"documents": {"type": "array", "items": {"type": "string"}}},
+        "required": ["documents"],
+    }},
+    "multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+    }},
+    "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+}}}
 
+async def _form_documents(request: Request) -> List[Any]:
+    documents: List[Any] = []
+    total = 0
+    async with request.form() as form:
+        for key, value in form.multi_items():
+            if isinstance(value, FormFile):
+                # Starlette has already spooled the part to a temp file, so
+                # its size is known before it is read into memory
+                size = value.size or 0
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise UploadTooLarge(f"File exceeds the {settings.MAX_UPLOAD_SIZE / (1024 * 1024):.0f}MB upload limit")
+                if total + size > settings.OCR_EXTRACT_MAX_BYTES:
+                    raise UploadTooLarge(f"Documents exceed the {settings.OCR_EXTRACT_MAX_BYTES / (1024 * 1024):.0f}MB request limit")
+                content = await value.read()
+                total += len(content)
+                filename = value.filename if value.filename and "." in value.filename else upload_filename(content)
+                documents.append((content, filename))
+            elif key == "documents":
+                documents.append(value)
+    if total > settings.OCR_EXTRACT_MAX_BYTES:
+        raise UploadTooLarge(f"Documents exceed the {settings.OCR_EXTRACT_MAX_BYTES / (1024 * 1024):.0f}MB request limit")
+    if not documents:
+        raise ValueError("documents must be a non-empty list")
+    return documents
 
-@app.post("/api/v1/ocr/extract/ind_aadhaar")
-async def extract_ind_aadhaar(payload: dict = Body(...)):
+async def _read_documents(request: Request, doc_type: str) -> List[Any]:
     """
-    Extract Aadhaar data.
+    Documents of an /extract request: URL or base64 strings, or
+    (file_bytes, filename) pairs that are already in memory.
+
+    Accepts a JSON {"documents": [...]} body, whose base64 entries are decoded
+    while the body streams in; multipart/form-data with file parts (and/or
+    "documents" text fields); or one raw application/octet-stream,
+    application/pdf or image/* body.
     """
-    documents = payload.get("documents")
-    if not isinstance(documents, list) or not documents:
-        raise HTTPException(status_code=400, detail="documents must be a non-empty list")
-    
-    merged_result: Dict[str, Any] = {}
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type == "multipart/form-data":
+            return await _form_documents(request)
+        if content_type in _BINARY_TYPES or content_type.startswith("image/"):
+            content = await read_binary(request.stream(), settings.MAX_UPLOAD_SIZE)
+            return [(content, upload_filename(content))]
+        if content_type not in ("", "application/json"):
+            raise HTTPException(status_code=415, detail=f"Unsupported content type {content_type}")
+        with stage("decode", doc_type):
+            documents = await read_json_documents(
+                request.stream(), settings.MAX_UPLOAD_SIZE, settings.OCR_EXTRACT_MAX_BYTES
+            )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [doc if isinstance(doc, str) else (doc, upload_filename(doc)) for doc in documents]
+
+def _decode_document(doc: str, doc_type: str):
+    b64_part = doc.split(",", 1)[1] if doc.startswith("data:") else doc
+    with stage("decode", doc_type):
+        content = base64.b64decode(b64_part)
+    return content, upload_filename(content)
+
+async def _load_document(doc: Any, doc_type: str, fetcher: FetchSession):
+    """
+    Resolve a URL or base64 document into (file_bytes, filename).
+    """
+    # --- Already in memory ---
+    if isinstance(doc, tuple):
+        return doc
+
+    # --- URL ---
+    if doc.startswith("http://") or doc.startswith("https://"):
+        with stage("download", doc_type):
+            fetched = await fetcher.fetch(doc)
+        return fetched.content, fetched.filename
+
+    # --- Base64 ---
+    return await run_in_threadpool(_decode_document, doc, doc_type)
+
+async def _extract_documents(documents: List[Any], doc_type: str) -> List[Any]:
+    """
+    Extract every document concurrently, at most OCR_DOCUMENT_CONCURRENCY at a
+    time. Results (or the raised exception) are returned in input order.
+
+    With OCR_BATCH_IMAGES, the images are instead sent together in as few LLM
+    calls as possible; documents that failed to load are reported after them.
+    """
+    semaphore = asyncio.Semaphore(settings.OCR_DOCUMENT_CONCURRENCY)
+    fetcher = FetchSession()
+
+    async def _load_one(doc: Any):
+        async with semaphore:
+            return await _load_document(doc, doc_type, fetcher)
 
-    for doc in documents:
+    if settings.OCR_BATCH_IMAGES and not settings.OCR_FAST_PATH and len(documents) > 1:
+        loaded = await asyncio.gather(*[_load_one(doc) for doc in documents], return_exceptions=True)
+        files = [item for item in loaded if not isinstance(item, Exception)]
+        errors = [item for item in loaded if isinstance(item, Exception)]
         try:
-            # --- URL ---
-            if doc.startswith("http://") or doc.startswith("https://"):
-                resp = requests.get(doc, stream=True, timeout=60)
-                resp.raise_for_status()
-                filename = doc.split("/")[-1].split("?")[0]
-                file_bytes = resp.content
-                detected_type = "ind_aadhaar"
-                result = _extract_from_bytes(file_bytes, filename, detected_type)
-
-            # --- Base64 ---
-            else:
-                b64_part = doc.split(",", 1)[1] if doc.startswith("data:") else doc
-                file_bytes = base64.b64decode(b64_part)
-                filename = "upload.jpg"
-                detected_type = "ind_aadhaar"
-                result = _extract_from_bytes(file_bytes, filename, detected_type)
-
-            # Merge results - _extract_from_bytes returns a JSON string
-            if isinstance(result, str):
+            results = await run_batch_extraction(files, doc_type) if files else []
+        except Exception as e:
+            results = [e]
+        return results + errors
+
+    async def _extract_one(doc: Any) -> Any:
+        async with semaphore:
+            file_bytes, filename = await _load_document(doc, doc_type, fetcher)
+            return await run_extraction(file_bytes, filename, doc_type)
+
+    return await asyncio.gather(*[_extract_one(doc) for doc in documents], return_exceptions=True)
+
+def _is_json_object(text: Any) -> bool:
+    try:
+        return isinstance(json.loads(_clean_gpt_json(text)), dict)
+    except (TypeError, ValueError):
+        return False
+
+def _merge_result(merged_result: Dict[str, Any], result: Any) -> None:
+    if isinstance(result, Exception):
+        merged_result["error"] = str(result)
+
+    # Merge results - _extract_from_bytes returns a JSON string
+    elif isinstance(result, str):
+        try:
+            cleaned = _clean_gpt_json(result)
+            parsed = json.loads(cleaned)
+            if isinstance(parsed, dict):
+                merged_result.update(parsed)
+        except json.JSONDecodeError as e:
+            merged_result["error"] = f"JSON parse error: {e}"
+            merged_result["raw"] = result
+    elif isinstance(result, dict):
+        merged_result.update(result)
+    elif isinstance(result, list):
+        # PDF pages ({"page", "json", ...} wrappers): merge the fields inside
+        pages = [r for r in result if isinstance(r, dict)]
+        merged_result.update(_merge_pages(pages))
+        if pages and not any(_is_json_object(r.get("json")) for r in pages):
+            # Every page's LLM call failed, as a single-call PDF would report
+            merged_result["error"] = "JSON parse error: no page returned a JSON object"
+            merged_result["raw"] = [r.get("json") for r in pages]
+        for r in result:
+            if isinstance(r, str):
                 try:
-                    cleaned = _clean_gpt_json(result)
+                    cleaned = _clean_gpt_json(r)
                     parsed = json.loads(cleaned)
                     if isinstance(parsed, dict):
                         merged_result.update(parsed)
-                except json.JSONDecodeError as e:
-                    merged_result["error"] = f"JSON parse error: {e}"
-                    merged_result["raw"] = result
-            elif isinstance(result, dict):
-                merged_result.update(result)
-            elif isinstance(result, list):
-                 for r in result:
-                    if isinstance(r, dict):
-                        merged_result.update(r)
-                    elif isinstance(r, str):
-                        try:
-                            cleaned = _clean_gpt_json(r)
-                            parsed = json.loads(cleaned)
-                            if isinstance(parsed, dict):
-                                merged_result.update(parsed)
-                        except Exception:
-                            pass
+                except Exception:
+                    pass
 
-        except Exception as e:
-            merged_result["error"] = str(e)
+async def _extract_and_merge(request: Request, doc_type: str) -> Dict[str, Any]:
+    documents = await _read_documents(request, doc_type)
+
+    merged_result: Dict[str, Any] = {}
+    for result in await _extract_documents(documents, doc_type):
+        _merge_result(merged_result, result)
 
     return {"results": merged_result}
 
+@app.post("/api/v1/ocr/extract/pan", openapi_extra=_EXTRACT_BODY)
+async def extract_ind_pan(request: Request):
+    """
+    Extract PAN data.
+    """
+    return await _extract_and_merge(request, "ind_pan")
+
 
-@app.post("/api/v1/ocr/extract/voterid")
-async def extract_voter_id(payload: dict = Body(...)):
+@app.post("/api/v1/ocr/extract/ind_aadhaar", openapi_extra=_EXTRACT_BODY)
+async def extract_ind_aadhaar(request: Request):
+    """
+    Extract Aadhaar data.
+    """
+    return await _extract_and_merge(request, "ind_aadhaar")
+
+
+@app.post("/api/v1/ocr/extract/voterid", openapi_extra=_EXTRACT_BODY)
+async def extract_voter_id(request: Request):
     """
     Extract Voter ID data.
     """
-    documents = payload.get("documents")
-    if not isinstance(documents, list) or not documents:
-        raise HTTPException(status_code=400, detail="documents must be a non-empty list")
+    return await _extract_and_merge(request, "ind_voterid")
 
-    merged_result: Dict[str, Any] = {}
+# ========================================
+# Batch Endpoint
+# ========================================
+def _batch_items(payload: dict) -> List[Dict[str, Any]]:
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="items must be a non-empty list")
+    if len(items) > settings.OCR_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"at most {settings.OCR_BATCH_MAX_ITEMS} items per batch")
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("document"), str) or not item.get("document"):
+            raise HTTPException(status_code=400, detail=f"items[{index}] needs a document string")
+        if not is_supported_doc_type(item.get("doc_type")):
+            raise HTTPException(status_code=400, detail=f"items[{index}]: unsupported doc_type {item.get('doc_type')!r}")
+    return items
 
-    for doc in documents:
+async def _extract_item(index: int, item: Dict[str, Any], semaphore: asyncio.Semaphore, fetcher: FetchSession) -> Dict[str, Any]:
+    doc_type = item["doc_type"]
+    line: Dict[str, Any] = {"index": index, "doc_type": doc_type}
+    if "id" in item:
+        line["id"] = item["id"]
+    try:
+        async with semaphore:
+            file_bytes, filename = await _load_document(item["document"], doc_type, fetcher)
+            result = await run_extraction(file_bytes, filename, doc_type)
+    except LLMRateLimited as e:
+        line.update(success=False, error=str(e), retry_after=e.retry_after)
+        return line
+    except Exception as e:
+        line.update(success=False, error=str(e))
+        return line
+
+    merged: Dict[str, Any] = {}
+    _merge_result(merged, result)
+    if "error" in merged:
+        line.update(success=False, error=merged["error"])
+    else:
+        line.update(success=True, results=merged)
+    return line
+
+@app.post("/api/v1/ocr/batch")
+async def extract_batch(payload: dict = Body(...)):
+    """
+    Extract a mix of document types in one call.
+
+    Body: {"items": [{"doc_type": "ind_pan", "document": "<url or base64>", "id": "optional"}, ...]}.
+    Items run concurrently (OCR_DOCUMENT_CONCURRENCY at a time) and each result
+    is written as one NDJSON line as soon as it finishes, so lines arrive in
+    completion order; "index" refers back to the request.
+    """
+    items = _batch_items(payload)
+    semaphore = asyncio.Semaphore(settings.OCR_DOCUMENT_CONCURRENCY)
+    fetcher = FetchSession()
+
+    async def ndjson():
+        tasks = [asyncio.ensure_future(_extract_item(i, item, semaphore, fetcher)) for i, item in enumerate(items)]
         try:
-            # --- URL ---
-            if doc.startswith("http://") or doc.startswith("https://"):
-                resp = requests.get(doc, stream=True, timeout=60)
-                resp.raise_for_status()
-                filename = doc.split("/")[-1].split("?")[0]
-                file_bytes = resp.content
-                detected_type = "ind_voterid"
-                result = _extract_from_bytes(file_bytes, filename, detected_type)
-
-            # --- Base64 ---
-            else:
-                b64_part = doc.split(",", 1)[1] if doc.startswith("data:") else doc
-                file_bytes = base64.b64decode(b64_part)
-                filename = "upload.jpg"
-                detected_type = "ind_voterid"
-                result = _extract_from_bytes(file_bytes, filename, detected_type)
-
-            # Merge results - _extract_from_bytes returns a JSON string
-            if isinstance(result, str):
-                try:
-                    cleaned = _clean_gpt_json(result)
-                    parsed = json.loads(cleaned)
-                    if isinstance(parsed, dict):
-                        merged_result.update(parsed)
-                except json.JSONDecodeError as e:
-                    merged_result["error"] = f"JSON parse error: {e}"
-                    merged_result["raw"] = result
-            elif isinstance(result, dict):
-                merged_result.update(result)
-            elif isinstance(result, list):
-                 for r in result:
-                    if isinstance(r, dict):
-                        merged_result.update(r)
-                    elif isinstance(r, str):
-                        try:
-                            cleaned = _clean_gpt_json(r)
-                            parsed = json.loads(cleaned)
-                            if isinstance(parsed, dict):
-                                merged_result.update(parsed)
-                        except Exception:
-                            pass
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            # Client went away: don't keep extracting for nobody
+            for task in tasks:
+                task.cancel()
 
-        except Exception as e:
-            merged_result["error"] = str(e)
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return {"results": merged_result}
+# ========================================
+# Async Job Endpoints
+# ========================================
+@app.post("/api/v1/ocr/jobs", response_model=InvoiceUpload, status_code=202)
+async def create_ocr_job(
+    file: UploadFile = File(...),
+    doc_type: str = Form(...),
+    created_by: str = Form("api"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Save the upload and queue extraction; poll GET /api/v1/ocr/jobs/{id} for the result.
+    """
+    if not is_supported_doc_type(doc_type):
+        raise HTTPException(status_code=400, detail=f"unsupported doc_type {doc_type!r}")
+
+    file_extension = Path(file.filename).suffix or ".jpg"
+    unique_filename = f"job_{uuid.uuid4().hex[:8]}{file_extension}"
+    file_path = UPLOADS_DIR / unique_filename
+
+    try:
+        _, file_digest = await save_upload(file, file_path, settings.MAX_UPLOAD_SIZE)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        job = await submit_job(db, str(file_path), doc_type, created_by, file_digest)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return InvoiceUpload(id=job.id, status=job.status, message="Job queued")
+
+@app.get("/api/v1/ocr/jobs/{job_id}", response_model=JobStatus)
+async def get_ocr_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Poll the status and, once completed, the extracted data of an OCR job.
+    """
+    job = await get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# ========================================
+# Document Endpoints
+# ========================================
+@app.get("/api/v1/documents", response_model=InvoiceList)
+async def list_processed_documents(
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_by: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    include: Optional[str] = Query(None, description="Comma-separated: extracted_data, reference_data, comparison"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    List documents newest first. Pass the returned next_cursor to get the
+    following page.
+    """
+    include_fields = [f.strip() for f in include.split(",")] if include else []
+    try:
+        return await list_documents(
+            db,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            created_by=created_by,
+            date_from=date_from,
+            date_to=date_to,
+            include=include_fields,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/v1/results/{document_id}", response_model=InvoiceResponse)
+async def get_document_results(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Full processing results for one document.
+    """
+    document = await get_document(db, document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Text, Index
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 
@@ -18,4 +18,13 @@ class Invoice(Base):
     reference_data = Column(JSON, nullable=True)
     reviewed = Column(Boolean, default=False)
     comparison = Column(JSON, nullable=True)  # Renamed from discrepancies
-    error_message = Column(Text, nullable=True) 
\ No newline at end of file
+    error_message = Column(Text, nullable=True)
+
+    # Listing pages newest-first by (created_at, id), optionally filtered by
+    # status or owner; InnoDB secondary indexes carry the primary key, so
+    # these cover the keyset order as well.
+    __table_args__ = (
+        Index("ix_invoices_created_at", "created_at"),
+        Index("ix_invoices_status_created_at", "status", "created_at"),
+        Index("ix_invoices_created_by_created_at", "created_by", "created_at"),
+    )
@@ -41,14 +41,31 @@ class DocumentSummary(BaseModel):
     processed_at: Optional[datetime] = None
     # status: initiated, parsed, completed, failed
     status: str
-    num_pages: int
+    num_pages: Optional[int] = None
     extracted_data: Optional[Dict[str, Any]] = None
     reference_data: Optional[Dict[str, Any]] = None
     comparison: Optional[Dict[str, Any]] = None  # Now a dict with invoice_details and comparison_results
     reviewed: bool
 
 class InvoiceList(BaseModel):
-    total: int
+    # Counted on the first page and carried forward by the cursor
+    total: Optional[int] = None
     page: int
     limit: int
-    documents: List[DocumentSummary] 
\ No newline at end of file
+    documents: List[DocumentSummary] 
+    # Opaque keyset cursor for the following page; None on the last page
+    next_cursor: Optional[str] = None
+
+class JobStatus(BaseModel):
+    id: int
+    name: str
+    created_at: datetime
+    processed_at: Optional[datetime] = None
+    # status: initiated, parsed, completed, failed
+    status: str
+    num_pages: Optional[int] = None
+    extracted_data: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+
+    class Config:
+        from_attributes = True
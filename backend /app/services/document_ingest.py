@@ -0,0 +1,273 @@
+import binascii
+from typing import AsyncIterator, List, Optional, Union
+
+from app.services.upload_service import UploadTooLarge
+
+# ----------------------------
+# Request body ingestion
+# ----------------------------
+# The /extract endpoints take {"documents": [...]} where each entry is a URL
+# or (data-URI) base64. Parsing that with json.loads holds the body, the
+# decoded string and then the decoded bytes at the same time. The reader
+# below walks the body as it streams in, decodes base64 entries straight
+# into a bytearray four characters at a time, and never materializes the
+# string, so a document costs roughly its decoded size.
+
+Document = Union[str, bytearray]
+
+_BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+# Everything else (whitespace, line breaks from wrapped encoders) is dropped,
+# as base64.b64decode does by default
+_NOT_BASE64 = bytes(c for c in range(256) if c not in _BASE64_ALPHABET)
+_ESCAPES = {ord('"'): b'"', ord("\\"): b"\\", ord("/"): b"/", ord("b"): b"\b",
+            ord("f"): b"\f", ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t"}
+# A URL or data-URI header longer than this is not a document reference
+_MAX_TEXT_BYTES = 64 * 1024
+
+
+def _too_large(max_bytes: int) -> UploadTooLarge:
+    return UploadTooLarge(f"Document exceeds the {max_bytes / (1024 * 1024):.0f}MB upload limit")
+
+
+def upload_filename(content: Union[bytes, bytearray]) -> str:
+    """Name for an unnamed upload; extraction picks the PDF path by extension."""
+    return "upload.pdf" if bytes(content[:4]) == b"%PDF" else "upload.jpg"
+
+
+class Base64Decoder:
+    """Decode base64 fed in arbitrary pieces into one bytearray."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.output = bytearray()
+        self._pending = b""
+
+    def feed(self, data: bytes) -> None:
+        data = self._pending + bytes(data).translate(None, _NOT_BASE64)
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        if usable:
+            self.output += binascii.a2b_base64(data[:usable])
+            if len(self.output) > self.max_bytes:
+                raise _too_large(self.max_bytes)
+
+    def finish(self) -> bytearray:
+        if self._pending.rstrip(b"="):
+            # Tolerate missing padding; a lone trailing character is not base64
+            if len(self._pending) % 4 == 1:
+                raise ValueError("invalid base64 document")
+            self.output += binascii.a2b_base64(self._pending + b"=" * (-len(self._pending) % 4))
+        self._pending = b""
+        return self.output
+
+
+class _DocumentString:
+    """One "documents" entry: kept as text if it is a URL, otherwise decoded."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._head = bytearray()
+        self._decoder: Optional[Base64Decoder] = None
+
+    def add(self, data: bytes) -> None:
+        if self._decoder is not None:
+            self._decoder.feed(data)
+            return
+        self._head += data
+        if self._head.startswith(b"data:"):
+            comma = self._head.find(b",")
+            if comma >= 0:
+                self._start_decoding(self._head[comma + 1:])
+        elif len(self._head) >= 8 and not self._head.startswith((b"http://", b"https://")):
+            self._start_decoding(self._head)
+        if self._decoder is None and len(self._head) > _MAX_TEXT_BYTES:
+            raise ValueError("document reference is too long")
+
+    def _start_decoding(self, data: bytearray) -> None:
+        self._decoder = Base64Decoder(self.max_bytes)
+        self._decoder.feed(data)
+        self._head = bytearray()
+
+    def finish(self) -> Document:
+        head = bytes(self._head)
+        if self._decoder is None and (head.startswith((b"http://", b"https://")) or head.startswith(b"data:")):
+            # A URL, or a data URI without a payload (left for the loader to reject)
+            return head.decode("utf-8", "replace")
+        if self._decoder is None:
+            self._start_decoding(self._head)
+        return self._decoder.finish()
+
+
+class JSONDocumentsReader:
+    """
+    Incremental reader for ``{"documents": ["<url or base64>", ...]}``.
+
+    Feed the body in chunks; ``documents`` holds URLs as ``str`` and decoded
+    base64 as ``bytearray``. Other top-level keys are skipped without being
+    kept. String contents are scanned with bytes.find rather than per byte,
+    so a 10MB document costs a handful of C-level calls per chunk.
+    """
+
+    def __init__(self, max_bytes: int, max_total_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.documents: List[Document] = []
+        self._decoded_total = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = b""
+        self._expect_key = False
+        self._key = bytearray()
+        self._reading_key = False
+        self._documents_next = False
+        self._in_documents = False
+        self._element: Optional[_DocumentString] = None
+        self._done = False
+
+    # --- string contents ---
+    def _string_data(self, data: bytes) -> None:
+        if self._element is not None:
+            self._element.add(data)
+        elif self._reading_key:
+            self._key += data
+            if len(self._key) > _MAX_TEXT_BYTES:
+                raise ValueError("JSON key is too long")
+
+    def _end_string(self) -> None:
+        self._in_string = False
+        if self._element is not None:
+            document = self._element.finish()
+            self._element = None
+            if not isinstance(document, str):
+                self._decoded_total += len(document)
+                if self._decoded_total > self.max_total_bytes:
+                    raise UploadTooLarge(f"Documents exceed the {self.max_total_bytes / (1024 * 1024):.0f}MB request limit")
+            self.documents.append(document)
+        elif self._reading_key:
+            self._reading_key = False
+
+    def _escape_length(self) -> int:
+        return 6 if len(self._escape) > 1 and self._escape[1] == ord("u") else 2
+
+    def _unescape(self, sequence: bytes) -> bytes:
+        if sequence[1] == ord("u"):
+            try:
+                return chr(int(sequence[2:6], 16)).encode("utf-8", "replace")
+            except ValueError:
+                raise ValueError("invalid JSON escape")
+        if sequence[1] not in _ESCAPES:
+            raise ValueError("invalid JSON escape")
+        return _ESCAPES[sequence[1]]
+
+    def _scan_string(self, chunk: bytes, i: int) -> int:
+        """Consume string contents from ``i``; returns the index after what was used."""
+        if self._escape:
+            # Finish an escape sequence, possibly split across chunks
+            while i < len(chunk) and len(self._escape) < self._escape_length():
+                self._escape += bytes(chunk[i:i + 1])
+                i += 1
+            if len(self._escape) == self._escape_length():
+                self._string_data(self._unescape(self._escape))
+                self._escape = b""
+            return i
+        quote, backslash = chunk.find(b'"', i), chunk.find(b"\\", i)
+        if quote < 0 and backslash < 0:
+            self._string_data(chunk[i:])
+            return len(chunk)
+        j = backslash if quote < 0 or 0 <= backslash < quote else quote
+        if j > i:
+            self._string_data(chunk[i:j])
+        if chunk[j] == ord('"'):
+            self._end_string()
+            return j + 1
+        self._escape = b"\\"
+        return j + 1
+
+    # --- structure ---
+    def _start_string(self) -> None:
+        self._in_string = True
+        if self._in_documents and self._depth == 2:
+            self._element = _DocumentString(self.max_bytes)
+        elif self._depth == 1 and self._expect_key:
+            self._reading_key = True
+            self._key = bytearray()
+        elif self._documents_next:
+            raise ValueError("documents must be a list")
+
+    def _structural(self, char: int) -> None:
+        if char in b" \t\r\n":
+            return
+        if self._depth == 0:
+            if char != ord("{") or self._done:
+                raise ValueError("body must be a JSON object")
+            self._depth = 1
+            self._expect_key = True
+            return
+        if char == ord('"'):
+            self._start_string()
+        elif char == ord(":") and self._depth == 1:
+            self._expect_key = False
+            self._documents_next = self._key == b"documents"
+        elif char == ord(",") and self._depth == 1:
+            self._expect_key = True
+        elif char in b"{[":
+            if self._documents_next:
+                if char != ord("["):
+                    raise ValueError("documents must be a list")
+                self._in_documents = True
+            elif self._in_documents:
+                raise ValueError("documents must be a list of strings")
+            self._documents_next = False
+            self._depth += 1
+        elif char in b"}]":
+            if self._in_documents and self._depth == 2:
+                self._in_documents = False
+            self._depth -= 1
+            if self._depth == 0:
+                self._done = True
+        elif char != ord(","):
+            # Bare literal or number
+            if self._documents_next:
+                raise ValueError("documents must be a list")
+            if self._in_documents and self._depth == 2:
+                raise ValueError("documents must be a list of strings")
+
+    def feed(self, chunk: bytes) -> None:
+        i = 0
+        while i < len(chunk):
+            if self._in_string:
+                i = self._scan_string(chunk, i)
+            else:
+                self._structural(chunk[i])
+                i += 1
+
+    def finish(self) -> List[Document]:
+        if not self._done:
+            raise ValueError("truncated JSON body")
+        return self.documents
+
+
+async def read_json_documents(stream: AsyncIterator[bytes], max_bytes: int, max_total_bytes: int) -> List[Document]:
+    """
+    Parse a ``{"documents": [...]}`` body from a byte stream.
+
+    Raises ValueError for malformed bodies and UploadTooLarge when a decoded
+    document exceeds ``max_bytes`` or all of them ``max_total_bytes``.
+    """
+    reader = JSONDocumentsReader(max_bytes, max_total_bytes)
+    async for chunk in stream:
+        reader.feed(chunk)
+    documents = reader.finish()
+    if not documents:
+        raise ValueError("documents must be a non-empty list")
+    return documents
+
+
+async def read_binary(stream: AsyncIterator[bytes], max_bytes: int) -> bytearray:
+    """Collect a raw document body, enforcing the size limit as chunks arrive."""
+    content = bytearray()
+    async for chunk in stream:
+        content += chunk
+        if len(content) > max_bytes:
+            raise _too_large(max_bytes)
+    return content
@@ -0,0 +1,118 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.invoice import Invoice
+from app.schemas.invoice import DocumentSummary, InvoiceList, InvoiceResponse
+
+# Columns every list row carries; the JSON blobs are opt-in via ``include``
+_SUMMARY_COLUMNS = [
+    Invoice.id,
+    Invoice.name,
+    Invoice.created_by,
+    Invoice.created_at,
+    Invoice.processed_at,
+    Invoice.status,
+    Invoice.num_pages,
+    Invoice.reviewed,
+]
+_OPTIONAL_COLUMNS = {
+    "extracted_data": Invoice.extracted_data,
+    "reference_data": Invoice.reference_data,
+    "comparison": Invoice.comparison,
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_cursor(created_at: datetime, row_id: int, page: int, total: Optional[int]) -> str:
+    raw = json.dumps({"t": created_at.isoformat(), "id": row_id, "p": page, "n": total})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int, int, Optional[int]]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        total = data.get("n")
+        return (datetime.fromisoformat(data["t"]), int(data["id"]), int(data["p"]),
+                int(total) if total is not None else None)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+
+
+async def list_documents(
+    db: AsyncSession,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_by: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    include: Optional[List[str]] = None,
+) -> InvoiceList:
+    """
+    Newest-first document listing with keyset pagination.
+
+    Each page continues after the (created_at, id) of the previous page's last
+    row, so deep pages cost the same as the first instead of an OFFSET scan.
+    The COUNT(*) for ``total`` runs on the first page only; later pages carry
+    that count forward in the cursor.
+    """
+    filters = []
+    if status:
+        filters.append(Invoice.status == status)
+    if created_by:
+        filters.append(Invoice.created_by == created_by)
+    if date_from:
+        filters.append(Invoice.created_at >= date_from)
+    if date_to:
+        filters.append(Invoice.created_at <= date_to)
+
+    page = 1
+    keyset = []
+    if cursor:
+        last_created_at, last_id, last_page, total = _decode_cursor(cursor)
+        page = last_page + 1
+        keyset.append(or_(
+            Invoice.created_at < last_created_at,
+            and_(Invoice.created_at == last_created_at, Invoice.id < last_id),
+        ))
+    else:
+        total = (await db.execute(select(func.count(Invoice.id)).where(*filters))).scalar()
+
+    extra = [name for name in (include or []) if name in _OPTIONAL_COLUMNS]
+    columns = _SUMMARY_COLUMNS + [_OPTIONAL_COLUMNS[name] for name in extra]
+    rows = (await db.execute(
+        select(*columns)
+        .where(*filters, *keyset)
+        .order_by(Invoice.created_at.desc(), Invoice.id.desc())
+        .limit(limit + 1)
+    )).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    documents = [DocumentSummary(**_row_dict(row)) for row in rows]
+    next_cursor = None
+    if has_more:
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id, page, total)
+
+    return InvoiceList(total=total, page=page, limit=limit, documents=documents, next_cursor=next_cursor)
+
+
+def _row_dict(row: Any) -> Dict[str, Any]:
+    data = dict(row._mapping)
+    data["reviewed"] = bool(data.get("reviewed"))
+    return data
+
+
+async def get_document(db: AsyncSession, document_id: int) -> Optional[InvoiceResponse]:
+    invoice = await db.get(Invoice, document_id)
+    if invoice is None:
+        return None
+    return InvoiceResponse.model_validate(invoice, from_attributes=True)
@@ -0,0 +1,82 @@
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# ----------------------------
+# Lazy heavy dependencies
+# ----------------------------
+# Paddle, OpenCV and the PDF libraries take seconds to import and most
+# requests never touch them, so they are loaded on first use (or by an
+# explicit warmup) instead of at import time of ocr_extractor.
+def _load_paddleocr() -> Any:
+    from paddleocr import PaddleOCR
+    return PaddleOCR(use_angle_cls=True, lang='en')
+
+
+_LOADERS: Dict[str, Callable[[], Any]] = {
+    "pdfplumber": lambda: importlib.import_module("pdfplumber"),
+    "pypdfium2": lambda: importlib.import_module("pypdfium2"),
+    "pdf2image": lambda: importlib.import_module("pdf2image"),
+    "cv2": lambda: importlib.import_module("cv2"),
+    "paddleocr": _load_paddleocr,
+}
+
+_engines: Dict[str, Any] = {}
+_load_ms: Dict[str, float] = {}
+_errors: Dict[str, str] = {}
+# A missing package stays missing for the life of the process, so the
+# ImportError is kept and re-raised instead of retrying the import per call
+_missing: Dict[str, ImportError] = {}
+# One lock per engine so a slow Paddle load doesn't hold up the PDF libraries
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _engine_lock(name: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def get_engine(name: str) -> Any:
+    """Return the named engine, loading it on first use."""
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+    if name in _missing:
+        raise _missing[name]
+    with _engine_lock(name):
+        if name not in _engines:
+            started = time.perf_counter()
+            try:
+                _engines[name] = _LOADERS[name]()
+            except ImportError as e:
+                _errors[name] = str(e)
+                _missing[name] = e
+                raise
+            except Exception as e:
+                _errors[name] = str(e)
+                raise
+            _load_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+            _errors.pop(name, None)
+            print(f"[DEBUG] Loaded engine {name} in {_load_ms[name]}ms")
+        return _engines[name]
+
+
+def warmup(names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Load the given engines (all by default) ahead of the first request."""
+    for name in names or _LOADERS:
+        try:
+            get_engine(name)
+        except Exception as e:
+            print(f"Engine warmup failed for {name}: {e}")
+    return engine_status()
+
+
+def engine_status() -> Dict[str, Dict[str, Any]]:
+    status = {}
+    for name in _LOADERS:
+        status[name] = {"loaded": name in _engines, "load_ms": _load_ms.get(name)}
+        if name in _errors:
+            status[name]["error"] = _errors[name]
+    return status
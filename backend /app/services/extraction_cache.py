@@ -0,0 +1,105 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache for extraction results.
+
+    Entries are the already-masked output of _extract_from_bytes, held in a
+    bounded in-memory LRU and optionally mirrored to a directory of JSON files
+    that expire after ``ttl_seconds``.
+    """
+
+    def __init__(self, max_entries: int = 1024, disk_dir: str = "", ttl_seconds: int = 86400):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(file_digest: str, doc_type: str, model: str, prompt_version: str) -> str:
+        """Key for the SHA-256 hex digest of a file's bytes."""
+        return hashlib.sha256(f"{file_digest}:{doc_type}:{model}:{prompt_version}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return copy.deepcopy(self._entries[key])
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, value)
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Any) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, value)
+            self._stats["stores"] += 1
+        self._write_disk(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self.disk_dir / f"{key}.json"
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        if not self.disk_dir:
+            return
+        path = self.disk_dir / f"{key}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(json.dumps(value))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Extraction cache write failed: {e}")
+
+
+extraction_cache = ExtractionCache(
+    max_entries=settings.OCR_CACHE_MAX_ENTRIES,
+    disk_dir=settings.OCR_CACHE_DIR,
+    ttl_seconds=settings.OCR_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,70 @@
+import threading
+from typing import Dict
+
+import httpx
+
+from app.core.config import settings
+
+# ----------------------------
+# Shared LLM HTTP clients
+# ----------------------------
+# One keep-alive pool per backend so repeated LLM calls reuse TCP+TLS
+# connections. Extraction runs on executor threads and uses the sync client;
+# async services (LLMService) use the async one.
+try:
+    import h2  # noqa: F401
+    _HTTP2 = settings.LLM_HTTP2
+except ImportError:
+    _HTTP2 = False
+
+_clients: Dict[str, httpx.Client] = {}
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=settings.LLM_CONNECT_TIMEOUT,
+        read=settings.LLM_READ_TIMEOUT,
+        write=settings.LLM_READ_TIMEOUT,
+        pool=settings.LLM_CONNECT_TIMEOUT,
+    )
+
+
+def get_client(backend: str) -> httpx.Client:
+    """Return the shared, thread-safe sync client for an LLM backend."""
+    client = _clients.get(backend)
+    if client is None:
+        with _lock:
+            client = _clients.get(backend)
+            if client is None:
+                client = httpx.Client(http2=_HTTP2, limits=_limits(), timeout=_timeout())
+                _clients[backend] = client
+    return client
+
+
+def get_async_client(backend: str) -> httpx.AsyncClient:
+    """Return the shared async client for an LLM backend (event-loop bound)."""
+    client = _async_clients.get(backend)
+    if client is None:
+        client = httpx.AsyncClient(http2=_HTTP2, limits=_limits(), timeout=_timeout())
+        _async_clients[backend] = client
+    return client
+
+
+async def close_clients() -> None:
+    for client in _async_clients.values():
+        await client.aclose()
+    _async_clients.clear()
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
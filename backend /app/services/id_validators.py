@@ -0,0 +1,243 @@
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+# ----------------------------
+# ID card field validators
+# ----------------------------
+# Used by the local-OCR fast path in ocr_extractor: fields are read from the
+# OCR lines with label/position heuristics and only kept when they pass a
+# strict format (and, for Aadhaar, checksum) check.
+
+# Fields that must validate for a result to skip the LLM entirely
+REQUIRED_FIELDS: Dict[str, List[str]] = {
+    "ind_pan": ["pan_no", "name", "fathers_name", "date_of_birth"],
+    "ind_aadhaar": ["aadhar_no", "name", "date_of_birth", "gender"],
+    "ind_aadhar": ["aadhar_no", "name", "date_of_birth", "gender"],
+    "ind_voterid": ["voter_id", "name", "fathers_name"],
+}
+
+_PAN_RE = re.compile(r"^[A-Z]{3}[ABCFGHLJPT][A-Z]\d{4}[A-Z]$")
+_VOTER_ID_RE = re.compile(r"^[A-Z]{3}\d{7}$")
+_AADHAAR_RE = re.compile(r"(?<!\d)(?<!\d\s)([2-9]\d{3})\s?(\d{4})\s?(\d{4})(?!\s?\d)")
+_DATE_RE = re.compile(r"(?<!\d)(\d{2})[/\-.](\d{2})[/\-.](\d{4})(?!\d)")
+_NAME_RE = re.compile(r"^[A-Z][A-Z .']{1,60}$")
+
+# Lines that are card furniture, never a person's name
+_STOPWORDS = (
+    "INCOME", "TAX", "DEPARTMENT", "GOVT", "GOVERNMENT", "INDIA", "PERMANENT",
+    "ACCOUNT", "NUMBER", "CARD", "SIGNATURE", "DATE", "BIRTH", "DOB", "NAME",
+    "FATHER", "HUSBAND", "MALE", "FEMALE", "ELECTION", "COMMISSION", "IDENTITY",
+    "ELECTOR", "AADHAAR", "UNIQUE", "AUTHORITY", "YEAR", "SEX", "GENDER", "ADDRESS",
+)
+
+# Verhoeff tables for the Aadhaar check digit
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8],
+    [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2],
+    [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 3, 1, 2, 6, 8, 7, 0],
+    [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5],
+    [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+]
+
+
+def verhoeff_valid(number: str) -> bool:
+    check = 0
+    for i, digit in enumerate(reversed(number)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[i % 8][int(digit)]]
+    return check == 0
+
+
+def valid_pan(value: str, doc_type: str = "ind_pan") -> bool:
+    if not _PAN_RE.match(value):
+        return False
+    # 4th character is the holder type: P for individuals, C for companies
+    if doc_type == "ind_pan":
+        return value[3] == "P"
+    if doc_type == "comp_pan":
+        return value[3] == "C"
+    return True
+
+
+def valid_date(value: str) -> bool:
+    try:
+        parsed = datetime.strptime(value, "%d/%m/%Y").date()
+    except ValueError:
+        return False
+    return date(1900, 1, 1) <= parsed <= date.today()
+
+
+def age_from_dob(value: str) -> int:
+    dob = datetime.strptime(value, "%d/%m/%Y").date()
+    today = date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def _fix_pan_token(token: str) -> str:
+    # Undo the usual OCR letter/digit confusions by position
+    to_digit = str.maketrans("OIZSB", "01258")
+    to_alpha = str.maketrans("01258", "OIZSB")
+    if len(token) != 10:
+        return token
+    return token[:5].translate(to_alpha) + token[5:9].translate(to_digit) + token[9].translate(to_alpha)
+
+
+def _is_name(line: str) -> bool:
+    line = line.strip().upper()
+    if not _NAME_RE.match(line) or len(line.replace(" ", "")) < 3:
+        return False
+    return not any(token in _STOPWORDS for token in re.findall(r"[A-Z]+", line))
+
+
+def _after_label(lines: List[str], labels: Tuple[str, ...]) -> Optional[Tuple[int, str]]:
+    """Value for a label, either after ':' on the same line or on the next line."""
+    for i, line in enumerate(lines):
+        upper = line.upper()
+        if not any(label in upper for label in labels):
+            continue
+        if ":" in line:
+            value = line.split(":", 1)[1].strip()
+            if value:
+                return i, value
+        if i + 1 < len(lines):
+            return i + 1, lines[i + 1].strip()
+    return None
+
+
+def _find_date(lines: List[str]) -> Optional[Tuple[int, str]]:
+    for i, line in enumerate(lines):
+        match = _DATE_RE.search(line)
+        if match:
+            value = "/".join(match.groups())
+            if valid_date(value):
+                return i, value
+    return None
+
+
+def _find_gender(lines: List[str]) -> Optional[Tuple[int, str]]:
+    for i, line in enumerate(lines):
+        upper = line.upper()
+        for gender in ("FEMALE", "TRANSGENDER", "MALE"):
+            if re.search(rf"\b{gender}\b", upper):
+                return i, gender.title()
+    return None
+
+
+def _extract_pan(lines: List[str], doc_type: str) -> Dict[str, Tuple[int, str]]:
+    fields: Dict[str, Tuple[int, str]] = {}
+    for i, line in enumerate(lines):
+        for token in re.findall(r"[A-Z0-9]{10}", line.upper().replace(" ", "")):
+            token = _fix_pan_token(token)
+            if valid_pan(token, doc_type):
+                fields["pan_no"] = (i, token)
+                break
+        if "pan_no" in fields:
+            break
+
+    dob = _find_date(lines)
+    if dob:
+        fields["date_of_birth"] = dob
+
+    # New layout: "Name" / "Father's Name" labels above the values
+    father = _after_label(lines, ("FATHER",))
+    name = _after_label([l if "FATHER" not in l.upper() else "" for l in lines], ("NAME",))
+    if name and _is_name(name[1]):
+        fields["name"] = (name[0], name[1].upper())
+    if father and _is_name(father[1]):
+        fields["fathers_name"] = (father[0], father[1].upper())
+
+    # Old layout: unlabelled name then father's name, above the date of birth
+    if "name" not in fields or "fathers_name" not in fields:
+        limit = dob[0] if dob else len(lines)
+        names = [(i, l.strip().upper()) for i, l in enumerate(lines[:limit]) if _is_name(l)]
+        if len(names) >= 2:
+            fields.setdefault("name", names[0])
+            fields.setdefault("fathers_name", names[1])
+    return fields
+
+
+def _extract_aadhaar(lines: List[str]) -> Dict[str, Tuple[int, str]]:
+    fields: Dict[str, Tuple[int, str]] = {}
+    for i, line in enumerate(lines):
+        # VID numbers are 16 digits; the lookarounds keep them from matching
+        match = _AADHAAR_RE.search(line)
+        if match and verhoeff_valid("".join(match.groups())):
+            fields["aadhar_no"] = (i, " ".join(match.groups()))
+            break
+
+    dob = _find_date(lines)
+    if dob:
+        fields["date_of_birth"] = dob
+        # The holder's name is the closest name-like line above the DOB
+        for i in range(dob[0] - 1, -1, -1):
+            if _is_name(lines[i]):
+                fields["name"] = (i, lines[i].strip().upper())
+                break
+
+    gender = _find_gender(lines)
+    if gender:
+        fields["gender"] = gender
+    return fields
+
+
+def _extract_voter_id(lines: List[str]) -> Dict[str, Tuple[int, str]]:
+    fields: Dict[str, Tuple[int, str]] = {}
+    for i, line in enumerate(lines):
+        for token in re.findall(r"[A-Z]{3}\d{7}", line.upper().replace(" ", "")):
+            if _VOTER_ID_RE.match(token):
+                fields["voter_id"] = (i, token)
+                break
+        if "voter_id" in fields:
+            break
+
+    relative = _after_label(lines, ("FATHER", "HUSBAND"))
+    name = _after_label(
+        [l if not any(k in l.upper() for k in ("FATHER", "HUSBAND")) else "" for l in lines],
+        ("NAME",),
+    )
+    if name and _is_name(name[1]):
+        fields["name"] = (name[0], name[1].upper())
+    if relative and _is_name(relative[1]):
+        fields["fathers_name"] = (relative[0], relative[1].upper())
+
+    dob = _find_date(lines)
+    if dob:
+        fields["date_of_birth"] = dob
+    gender = _find_gender(lines)
+    if gender:
+        fields["gender"] = gender
+    return fields
+
+
+def extract_fields(
+    lines: List[Tuple[str, float]], doc_type: str, min_confidence: float
+) -> Dict[str, str]:
+    """
+    Validated fields read from OCR (text, confidence) lines. A field is only
+    returned when its source line meets ``min_confidence``.
+    """
+    texts = [text for text, _ in lines]
+    if doc_type in ("ind_pan", "comp_pan"):
+        found = _extract_pan(texts, doc_type)
+    elif doc_type in ("ind_aadhaar", "ind_aadhar"):
+        found = _extract_aadhaar(texts)
+    elif doc_type == "ind_voterid":
+        found = _extract_voter_id(texts)
+    else:
+        return {}
+    return {key: value for key, (i, value) in found.items() if lines[i][1] >= min_confidence}
@@ -0,0 +1,86 @@
+from io import BytesIO
+from typing import Any, Dict, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+
+# ----------------------------
+# Image normalization
+# ----------------------------
+# Phone photos are often 8-12 MB; the vision models read ID cards just as well
+# at a fraction of the resolution, and size drives upload time and image tokens.
+_MAX_SIDE_BY_TYPE = {
+    "ind_pan": 1600,
+    "comp_pan": 1600,
+    "ind_aadhaar": 1600,
+    "ind_aadhar": 1600,
+    "ind_voterid": 1600,
+    "ind_driving_license": 1600,
+    "business_card": 1600,
+}
+
+# Formats the LLM backends accept as-is
+_PASSTHROUGH_MIME = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+}
+
+
+def _sniff_mime(file_bytes: bytes) -> str:
+    if file_bytes[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if file_bytes[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if file_bytes[:4] == b"RIFF" and file_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def normalize_image(file_bytes: bytes, doc_type: str) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    Fix EXIF orientation, downscale to the doc type's max side and recompress.
+
+    Returns (image_bytes, mime_type, stats). The original bytes are kept when
+    they are already small enough and re-encoding would not shrink them.
+    """
+    stats: Dict[str, Any] = {"bytes_in": len(file_bytes)}
+    try:
+        img = Image.open(BytesIO(file_bytes))
+        img.load()
+    except (UnidentifiedImageError, OSError) as e:
+        mime = _sniff_mime(file_bytes)
+        stats.update({"format": "unknown", "bytes_out": len(file_bytes), "error": str(e)})
+        return file_bytes, mime, stats
+
+    stats["format"] = img.format
+    stats["size_in"] = img.size
+    max_side = _MAX_SIDE_BY_TYPE.get(doc_type, settings.OCR_IMAGE_MAX_SIDE)
+
+    # 0x0112 is the EXIF Orientation tag; 1 means already upright
+    needs_rotate = img.getexif().get(0x0112, 1) != 1
+    needs_resize = max(img.size) > max_side
+    passthrough = not needs_rotate and not needs_resize and img.format in _PASSTHROUGH_MIME
+    if passthrough and len(file_bytes) <= settings.OCR_IMAGE_PASSTHROUGH_BYTES:
+        stats.update({"size_out": img.size, "bytes_out": len(file_bytes)})
+        return file_bytes, _PASSTHROUGH_MIME[img.format], stats
+
+    if needs_rotate:
+        img = ImageOps.exif_transpose(img)
+    if needs_resize:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    buffered = BytesIO()
+    img.save(buffered, format="JPEG", quality=settings.OCR_IMAGE_JPEG_QUALITY, optimize=True)
+    out = buffered.getvalue()
+
+    # Re-encoding an upright, already compact image can make it bigger
+    if passthrough and len(out) >= len(file_bytes):
+        stats.update({"size_out": img.size, "bytes_out": len(file_bytes)})
+        return file_bytes, _PASSTHROUGH_MIME[stats["format"]], stats
+
+    stats.update({"size_out": img.size, "bytes_out": len(out)})
+    return out, "image/jpeg", stats
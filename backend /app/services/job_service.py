@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.invoice import Invoice
+from app.services.ocr_extractor import (
+    _extract_from_bytes, _extract_batch_from_bytes, _clean_gpt_json, stream_extract_fields,
+)
+from app.services.upload_service import mapped_file
+
+# ----------------------------
+# Bounded executor
+# ----------------------------
+# Extraction does blocking LLM calls and CPU-bound PDF/OCR work, so it never
+# runs on the event loop. The semaphore caps running + queued work so a burst
+# of uploads is rejected instead of piling up in the executor's queue.
+_executor = ThreadPoolExecutor(max_workers=settings.OCR_MAX_WORKERS, thread_name_prefix="ocr")
+_slots = threading.BoundedSemaphore(settings.OCR_MAX_WORKERS + settings.OCR_MAX_QUEUED_JOBS)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _submit(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise JobQueueFull("OCR job queue is full, retry later")
+    try:
+        # Carry context variables (profiling timeline) into the worker
+        future = _executor.submit(contextvars.copy_context().run, fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+async def run_extraction(file_bytes: bytes, filename: str, doc_type: str) -> Any:
+    """Run _extract_from_bytes on the bounded executor and await its result."""
+    return await asyncio.wrap_future(_submit(_extract_from_bytes, file_bytes, filename, doc_type))
+
+
+def _extract_from_file(file_path: str, filename: str, doc_type: str, file_digest: Optional[str] = None) -> Any:
+    with mapped_file(file_path) as file_bytes:
+        return _extract_from_bytes(file_bytes, filename, doc_type, file_digest)
+
+
+async def run_file_extraction(file_path: str, filename: str, doc_type: str, file_digest: Optional[str] = None) -> Any:
+    """Extract a saved upload on the bounded executor, reading it through mmap."""
+    return await asyncio.wrap_future(_submit(_extract_from_file, file_path, filename, doc_type, file_digest))
+
+
+async def run_batch_extraction(files: List[Tuple[bytes, str]], doc_type: str) -> List[Any]:
+    """Run _extract_batch_from_bytes on the bounded executor and await its results."""
+    return await asyncio.wrap_future(_submit(_extract_batch_from_bytes, files, doc_type))
+
+
+def _stream_from_file(file_path: str, filename: str, doc_type: str, file_digest: Optional[str],
+                      emit: Callable[[Dict[str, Any]], None], cancelled: threading.Event) -> None:
+    try:
+        with mapped_file(file_path) as file_bytes:
+            events = stream_extract_fields(file_bytes, filename, doc_type, file_digest)
+            try:
+                for event in events:
+                    if cancelled.is_set():
+                        break
+                    emit(event)
+            finally:
+                # Closing the generator closes the upstream LLM stream too
+                events.close()
+    except Exception as e:
+        emit({"error": str(e)})
+
+
+def stream_file_extraction(
+    file_path: str, filename: str, doc_type: str, file_digest: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Extract a saved upload on the bounded executor and return an async iterator
+    of the stream_extract_fields events the worker produces. JobQueueFull is
+    raised here, before anything is streamed; closing the iterator early
+    cancels the worker at its next event.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+    emit = lambda event: loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    future = _submit(_stream_from_file, file_path, filename, doc_type, file_digest, emit, cancelled)
+    future.add_done_callback(lambda _: emit(None))
+
+    async def events() -> AsyncIterator[Dict[str, Any]]:
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            cancelled.set()
+
+    return events()
+
+
+# ----------------------------
+# Job lifecycle
+# ----------------------------
+# Jobs are rows in the invoices table and follow its status lifecycle:
+# initiated (queued) -> parsed (LLM output parsed) -> completed | failed
+def _parse_result(result: Any) -> Dict[str, Any]:
+    if isinstance(result, str):
+        return json.loads(_clean_gpt_json(result))
+    if isinstance(result, list):
+        pages = []
+        for r in result:
+            try:
+                data = json.loads(_clean_gpt_json(r.get("json", "")))
+            except json.JSONDecodeError:
+                data = {"raw": r.get("json", "")}
+            page = {"page": r.get("page"), "data": data, "elapsed_ms": r.get("elapsed_ms")}
+            if "pages" in r:
+                # One entry for all text-layer pages of a mixed PDF
+                page["pages"] = r["pages"]
+            pages.append(page)
+        return {"pages": pages}
+    return result
+
+
+def _update_job(job_id: int, **fields: Any) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Invoice).filter(Invoice.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _run_job(job_id: int, file_path: str, doc_type: str, file_digest: Optional[str]) -> None:
+    try:
+        data = _parse_result(_extract_from_file(file_path, Path(file_path).name, doc_type, file_digest))
+        _update_job(job_id, status="parsed", extracted_data=data)
+        num_pages = 1
+        if isinstance(data, dict) and "pages" in data:
+            # A mixed PDF's text-layer entry stands for several pages
+            num_pages = sum(len(p.get("pages") or [p.get("page")]) for p in data["pages"])
+        _update_job(
+            job_id,
+            status="completed",
+            num_pages=num_pages,
+            processed_at=datetime.now(timezone.utc),
+        )
+    except Exception as e:
+        print(f"OCR job {job_id} failed: {e}")
+        _update_job(
+            job_id,
+            status="failed",
+            error_message=str(e),
+            processed_at=datetime.now(timezone.utc),
+        )
+
+
+async def submit_job(
+    db: AsyncSession, file_path: str, doc_type: str, created_by: str, file_digest: Optional[str] = None
+) -> Invoice:
+    """Persist a new job in the initiated state and queue it on the executor."""
+    job = Invoice(name=Path(file_path).name, created_by=created_by, status="initiated")
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    try:
+        _submit(_run_job, job.id, file_path, doc_type, file_digest)
+    except JobQueueFull as e:
+        job.status = "failed"
+        job.error_message = str(e)
+        await db.commit()
+        raise
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: int) -> Optional[Invoice]:
+    return await db.get(Invoice, job_id)
@@ -0,0 +1,86 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JSONFieldStream:
+    """
+    Incremental parser for a streamed JSON object.
+
+    Text is fed as it arrives (markdown fences and any chatter before the
+    opening brace are skipped) and each top-level ``key: value`` pair is
+    returned as soon as the separator after it has been seen, so callers can
+    act on fields long before the object is complete.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._segment_start = -1
+        self._object_start = -1
+        # Bounds of the top-level object once it has closed
+        self._object: Optional[Tuple[int, int]] = None
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        fields: List[Tuple[str, Any]] = []
+        if self.done:
+            return fields
+        self._buffer += text
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    if char != "{":
+                        # Top level is not an object; nothing to stream
+                        self.done = True
+                        return fields
+                    self._object_start = self._pos
+                    self._segment_start = self._pos + 1
+            elif char in "}]" and self._depth > 0:
+                if self._depth == 1:
+                    fields.extend(self._take_segment(self._pos))
+                    self._object = (self._object_start, self._pos + 1)
+                    self.done = True
+                    self._pos += 1
+                    return fields
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                fields.extend(self._take_segment(self._pos))
+                self._segment_start = self._pos + 1
+            self._pos += 1
+        return fields
+
+    def _take_segment(self, end: int) -> List[Tuple[str, Any]]:
+        segment = self._buffer[self._segment_start:end].strip()
+        if not segment:
+            return []
+        try:
+            return list(json.loads("{" + segment + "}").items())
+        except ValueError:
+            # Malformed pair (e.g. a trailing comment); the final parse decides
+            return []
+
+    def text(self) -> str:
+        """
+        The object's text once it has closed, without the fences or chatter
+        around it; until then (or for a non-object reply) the text fed so far.
+        """
+        if self._object is not None:
+            return self._buffer[self._object[0]:self._object[1]]
+        return self._buffer
+
@@ -0,0 +1,296 @@
+import contextvars
+import email.utils
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.services.profiling import span
+
+# ----------------------------
+# LLM concurrency + rate limits
+# ----------------------------
+# One limiter per backend, shared by every thread in the process. Callers queue
+# FIFO for an in-flight slot and for request/token budget, so a burst of
+# multi-page PDFs waits here instead of collecting 429s upstream.
+
+_RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class LLMRateLimited(RuntimeError):
+    """The backend kept answering 429 after all retries."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Continuously refilling budget of ``per_minute`` units; 0 means unlimited."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    def deficit(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 when it is)."""
+        if not self.capacity:
+            return 0.0
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity:
+            self.available -= min(amount, self.capacity)
+
+
+class BackendLimiter:
+    def __init__(self, name: str, max_in_flight: int, requests_per_minute: int, tokens_per_minute: int):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._cond = threading.Condition()
+        # Ticket numbers make the wait queue first-come, first-served
+        self._next_ticket = 0
+        self._serving = 0
+        self.in_flight = 0
+        self._stats = {"acquired": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0, "retries": 0, "throttled": 0}
+
+    @contextmanager
+    def slot(self, tokens: int) -> Iterator[None]:
+        started = time.perf_counter()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while True:
+                if ticket == self._serving and self.in_flight < self.max_in_flight:
+                    delay = max(self._requests.deficit(1), self._tokens.deficit(tokens))
+                    if delay == 0:
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self.in_flight += 1
+            self._serving += 1
+            wait_ms = (time.perf_counter() - started) * 1000
+            self._stats["acquired"] += 1
+            self._stats["wait_ms_total"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def record_retry(self, throttled: bool) -> None:
+        with self._cond:
+            self._stats["retries"] += 1
+            if throttled:
+                self._stats["throttled"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            acquired = self._stats["acquired"]
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queue_depth": self._next_ticket - self._serving,
+                "acquired": acquired,
+                "wait_ms_avg": round(self._stats["wait_ms_total"] / acquired, 3) if acquired else 0.0,
+                "wait_ms_max": round(self._stats["wait_ms_max"], 3),
+                "retries": self._stats["retries"],
+                "throttled": self._stats["throttled"],
+            }
+
+
+def _backend_limits(backend: str) -> Tuple[int, int, int]:
+    if backend == "github":
+        return settings.LLM_GITHUB_MAX_IN_FLIGHT, settings.LLM_GITHUB_RPM, settings.LLM_GITHUB_TPM
+    if backend == "ollama":
+        return settings.LLM_OLLAMA_MAX_IN_FLIGHT, settings.LLM_OLLAMA_RPM, settings.LLM_OLLAMA_TPM
+    return settings.LLM_POOL_MAX_CONNECTIONS, 0, 0
+
+
+_limiters: Dict[str, BackendLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(backend: str) -> BackendLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(backend)
+        if limiter is None:
+            limiter = BackendLimiter(backend, *_backend_limits(backend))
+            _limiters[backend] = limiter
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def estimate_tokens(payload: Dict[str, Any]) -> int:
+    """Rough token cost of a chat request: prompt text, images and the completion budget."""
+    tokens = payload.get("max_tokens", 0)
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "image_url":
+                # High-detail image tiles land around this on OpenAI-style APIs
+                tokens += 1000
+            else:
+                tokens += len(part.get("text", "")) // 4
+    return tokens
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP-date form
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _transfer_bytes(resp: httpx.Response) -> Dict[str, int]:
+    try:
+        # Streamed bodies (images) aren't kept, but carry a Content-Length
+        sent = int(resp.request.headers.get("content-length", -1))
+    except (RuntimeError, ValueError):
+        # No request attached
+        sent = -1
+    return {"bytes_sent": sent, "bytes_received": len(resp.content)}
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter keeps retrying workers from synchronising
+    cap = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+def _retry_delay(limiter: BackendLimiter, backend: str, resp: httpx.Response, attempt: int) -> float:
+    retry_after = _retry_after(resp)
+    delay = retry_after if retry_after is not None else _backoff(attempt)
+    delay = min(delay, settings.LLM_RETRY_MAX_DELAY)
+    limiter.record_retry(resp.status_code == 429)
+    print(f"[DEBUG] {backend} LLM API {resp.status_code}, retrying in {delay:.1f}s")
+    return delay
+
+
+class AttemptTimer:
+    """
+    When the current HTTP attempt started and, once answered, how long it
+    took: backend latency without the limiter's slot wait or retry backoff.
+    """
+
+    def __init__(self):
+        self.started: Optional[float] = None
+        self.elapsed: Optional[float] = None
+
+
+_attempt_timer: contextvars.ContextVar[Optional[AttemptTimer]] = contextvars.ContextVar("llm_attempt_timer", default=None)
+
+
+@contextmanager
+def attempt_timer() -> Iterator[AttemptTimer]:
+    """Time the HTTP attempts made by send_limited/stream_limited in this block."""
+    timer = AttemptTimer()
+    token = _attempt_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _attempt_timer.reset(token)
+
+
+def _attempt_started() -> None:
+    timer = _attempt_timer.get()
+    if timer is not None:
+        timer.started = time.monotonic()
+        timer.elapsed = None
+
+
+def _attempt_answered() -> None:
+    timer = _attempt_timer.get()
+    if timer is not None and timer.started is not None:
+        timer.elapsed = time.monotonic() - timer.started
+
+
+def send_limited(backend: str, payload: Dict[str, Any], send: Callable[[], httpx.Response]) -> httpx.Response:
+    """
+    Run ``send`` inside the backend's limiter, retrying 429/5xx answers with
+    jittered exponential backoff (or the server's Retry-After). Raises
+    LLMRateLimited if the backend is still throttling after the last retry.
+    """
+    limiter = get_limiter(backend)
+    tokens = estimate_tokens(payload)
+    for attempt in range(settings.LLM_RETRY_MAX + 1):
+        with span("llm_attempt", backend=backend, attempt=attempt) as info:
+            queued = time.perf_counter()
+            with limiter.slot(tokens):
+                info["slot_wait_ms"] = round((time.perf_counter() - queued) * 1000, 3)
+                _attempt_started()
+                resp = send()
+                _attempt_answered()
+            info.update(status=resp.status_code, **_transfer_bytes(resp))
+        if resp.status_code not in _RETRY_STATUSES or attempt == settings.LLM_RETRY_MAX:
+            break
+        time.sleep(_retry_delay(limiter, backend, resp, attempt))
+
+    if resp.status_code == 429:
+        raise LLMRateLimited(f"{backend.upper()} LLM API rate limited: {resp.text}", _retry_after(resp))
+    return resp
+
+
+@contextmanager
+def stream_limited(
+    backend: str, payload: Dict[str, Any], open_stream: Callable[[], ContextManager[httpx.Response]]
+) -> Iterator[httpx.Response]:
+    """
+    send_limited for streamed responses. The limiter slot is held until the
+    caller has finished reading the body; retries only happen on error
+    statuses, before any of the stream has been handed out.
+    """
+    limiter = get_limiter(backend)
+    tokens = estimate_tokens(payload)
+    for attempt in range(settings.LLM_RETRY_MAX + 1):
+        with span("llm_attempt", backend=backend, attempt=attempt, stream=True) as info:
+            queued = time.perf_counter()
+            with limiter.slot(tokens):
+                info["slot_wait_ms"] = round((time.perf_counter() - queued) * 1000, 3)
+                _attempt_started()
+                with open_stream() as resp:
+                    info["status"] = resp.status_code
+                    if resp.status_code not in _RETRY_STATUSES or attempt == settings.LLM_RETRY_MAX:
+                        if resp.status_code == 429:
+                            resp.read()
+                            raise LLMRateLimited(
+                                f"{backend.upper()} LLM API rate limited: {resp.text}", _retry_after(resp)
+                            )
+                        yield resp
+                        return
+                    resp.read()
+                    delay = _retry_delay(limiter, backend, resp, attempt)
+        time.sleep(delay)
@@ -0,0 +1,96 @@
+import base64
+import json
+import mmap
+import re
+import uuid
+from typing import Any, Dict, Iterator, List, Union
+
+# ----------------------------
+# Streamed chat request bodies
+# ----------------------------
+# A vision request built as a dict and sent with json= holds the image, its
+# base64 str, the serialized JSON str and its UTF-8 bytes at once - about
+# five times the image per in-flight call, per page. Images are instead kept
+# in the content list as InlineImage and json_request() yields the body in
+# chunks, base64-encoding each window of the buffer as it is sent. The length
+# is known up front, so the body still goes out with a Content-Length.
+
+_CHUNK_SIZE = 64 * 1024
+# Stands in for an image in the serialized JSON; split out again afterwards.
+# Random per process so no prompt or page text can collide with it.
+_MARK = f"__inline_image_{uuid.uuid4().hex}__:"
+_MARK_SPLIT = re.compile(rb'"' + re.escape(_MARK.encode()) + rb'(\d+)"')
+
+
+class InlineImage:
+    """
+    Image bytes that serialize as a ``data:`` URI without building the string.
+
+    Bytes mapped from an upload file are copied: a hedged request that lost
+    the race may still be sending them after the winner returned and the
+    mapping was closed.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap], mime_type: str):
+        base = data.obj if isinstance(data, memoryview) else data
+        self.data = bytes(data) if isinstance(base, mmap.mmap) else data
+        self.mime_type = mime_type
+
+    def _prefix(self) -> bytes:
+        return f'"data:{self.mime_type};base64,'.encode()
+
+    def encoded_length(self) -> int:
+        """Bytes chunks() yields: the quoted data URI."""
+        return len(self._prefix()) + 4 * -(-len(self.data) // 3) + 1
+
+    def chunks(self, chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+        yield self._prefix()
+        view = memoryview(self.data)
+        # Whole 3-byte groups per window, so only the last one is padded
+        step = max(3, chunk_size // 4 * 3)
+        for start in range(0, len(view), step):
+            yield base64.b64encode(view[start:start + step])
+        yield b'"'
+
+    def data_uri(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode()}"
+
+
+def image_part(data: Union[bytes, bytearray, memoryview], mime_type: str) -> Dict[str, Any]:
+    """An ``image_url`` content part whose URL is encoded only while the request is sent."""
+    return {"type": "image_url", "image_url": {"url": InlineImage(data, mime_type)}}
+
+
+def json_request(headers: Dict[str, str], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ``headers``/``content`` keyword arguments for an httpx request with
+    ``payload`` as its JSON body.
+
+    Call it once per attempt: the content is a one-shot iterator when the
+    payload carries InlineImage parts, and plain bytes otherwise.
+    """
+    images: List[InlineImage] = []
+
+    def placeholder(value: Any) -> str:
+        if isinstance(value, InlineImage):
+            images.append(value)
+            return f"{_MARK}{len(images) - 1}"
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    text = json.dumps(payload, default=placeholder).encode()
+    if not images:
+        return {"headers": headers, "content": text}
+
+    # [json, image index, json, image index, ..., json]
+    pieces = _MARK_SPLIT.split(text)
+    length = sum(len(pieces[i]) for i in range(0, len(pieces), 2))
+    length += sum(images[int(pieces[i])].encoded_length() for i in range(1, len(pieces), 2))
+
+    def body() -> Iterator[bytes]:
+        for i, piece in enumerate(pieces):
+            if i % 2:
+                yield from images[int(piece)].chunks()
+            elif piece:
+                yield piece
+
+    return {"headers": {**headers, "Content-Length": str(length)}, "content": body()}
@@ -0,0 +1,285 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.llm_limiter import AttemptTimer, LLMRateLimited, attempt_timer
+from app.services.profiling import event, span
+
+# ----------------------------
+# LLM backend health + failover
+# ----------------------------
+# Each backend gets a circuit breaker: consecutive errors or slow answers open
+# it, and after a cooldown a single probe request decides whether it closes
+# again. Open backends are skipped instead of waiting out their timeout.
+
+_LATENCY_WINDOW = 200
+# Below this many samples the p95 is too noisy to hedge on
+_MIN_HEDGE_SAMPLES = 20
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, slow_seconds: float, cooldown_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._latencies: deque = deque(maxlen=_LATENCY_WINDOW)
+        self._counts = {"successes": 0, "failures": 0, "slow": 0, "throttled": 0, "rejected": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; claims the probe slot when half-open."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._counts["rejected"] += 1
+            return False
+
+    def record_success(self, elapsed: float) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            self._latencies.append(elapsed)
+            self._counts["successes"] += 1
+            if elapsed > self.slow_seconds:
+                # A latency spike counts against the backend like an error
+                self._counts["slow"] += 1
+                self._strike()
+                return
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            self._counts["failures"] += 1
+            self._strike()
+
+    def record_throttled(self) -> None:
+        """A 429 after the limiter's retries: neither a success nor a failure."""
+        with self._lock:
+            self._probe_in_flight = False
+            self._counts["throttled"] += 1
+
+    def _strike(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self._counts["opened"] += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < _MIN_HEDGE_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "p95_seconds": round(p95, 3) if p95 is not None else None,
+                **self._counts,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=settings.LLM_POOL_MAX_CONNECTIONS, thread_name_prefix="llm-hedge"
+)
+
+
+def get_breaker(backend: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(backend)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                backend,
+                failure_threshold=settings.LLM_BREAKER_FAILURES,
+                slow_seconds=settings.LLM_BREAKER_SLOW_SECONDS,
+                cooldown_seconds=settings.LLM_BREAKER_COOLDOWN_SECONDS,
+            )
+            _breakers[backend] = breaker
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Any]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def _elapsed(timer: AttemptTimer, started: float) -> float:
+    # Only the last HTTP attempt when the limiter timed it, so local queueing
+    # and retry backoff don't count as backend latency
+    if timer.elapsed is not None:
+        return timer.elapsed
+    return time.monotonic() - (timer.started if timer.started is not None else started)
+
+
+def call_backend(backend: str, send: Callable[[], str]) -> str:
+    """Run ``send`` and record the outcome on the backend's breaker."""
+    breaker = get_breaker(backend)
+    started = time.monotonic()
+    try:
+        with span("llm_backend", backend=backend), attempt_timer() as timer:
+            result = send()
+    except LLMRateLimited:
+        breaker.record_throttled()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success(_elapsed(timer, started))
+    return result
+
+
+def _hedge_delay(breaker: CircuitBreaker) -> float:
+    p95 = breaker.p95()
+    if p95 is None:
+        return settings.LLM_HEDGE_DEFAULT_DELAY
+    return max(p95, settings.LLM_HEDGE_MIN_DELAY)
+
+
+def _next_available(backends: Iterator[Tuple[str, Callable[[], str]]]) -> Optional[Tuple[str, Callable[[], str]]]:
+    # Breakers are asked lazily: allow() claims the half-open probe slot
+    for name, send in backends:
+        if get_breaker(name).allow():
+            return name, send
+        event("llm_skipped", backend=name, reason="circuit_open")
+    return None
+
+
+def _hedged(primary: Tuple[str, Callable[[], str]], fallbacks: Iterator[Tuple[str, Callable[[], str]]]) -> str:
+    """
+    Send to ``primary``; if it hasn't answered by its p95 deadline, also send to
+    the next available fallback and keep whichever succeeds first. The loser
+    runs to completion in the background so its latency still feeds its breaker.
+    """
+    first = _hedge_executor.submit(contextvars.copy_context().run, call_backend, *primary)
+    done, _ = wait([first], timeout=_hedge_delay(get_breaker(primary[0])))
+    if done and first.exception() is None:
+        return first.result()
+
+    pending = set() if done else {first}
+    errors: List[BaseException] = [first.exception()] if done else []
+    secondary = _next_available(fallbacks)
+    if secondary is not None:
+        print(f"[DEBUG] Hedging LLM request to {secondary[0]}")
+        event("llm_hedge", backend=secondary[0])
+        pending.add(_hedge_executor.submit(contextvars.copy_context().run, call_backend, *secondary))
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            errors.append(future.exception())
+    raise errors[-1]
+
+
+def route(backends: List[Tuple[str, Callable[[], str]]], hedge: bool = False) -> str:
+    """
+    Try ``(name, send)`` backends in order, skipping those whose breaker is
+    open. With ``hedge`` the primary is raced against the next backend once it
+    passes its p95 deadline. Returns "" when every backend failed or was skipped,
+    or raises LLMRateLimited when every attempt was throttled.
+    """
+    remaining = iter(backends)
+    primary = _next_available(remaining)
+    if primary is None:
+        print(f"LLM Error: all backends unavailable ({', '.join(name for name, _ in backends)})")
+        return ""
+
+    errors: List[Exception] = []
+    if hedge and len(backends) > 1:
+        try:
+            return _hedged(primary, remaining)
+        except Exception as e:
+            print(f"LLM Error (hedged): {e}")
+            errors.append(e)
+    else:
+        try:
+            return call_backend(*primary)
+        except Exception as e:
+            print(f"{primary[0]} LLM Error: {e}")
+            errors.append(e)
+
+    while (candidate := _next_available(remaining)) is not None:
+        try:
+            return call_backend(*candidate)
+        except Exception as e:
+            print(f"{candidate[0]} LLM Error: {e}")
+            errors.append(e)
+
+    # Throttling is worth telling the client about, so it can back off too
+    if errors and all(isinstance(e, LLMRateLimited) for e in errors):
+        raise errors[-1]
+    return ""
+
+
+def stream_route(backends: List[Tuple[str, Callable[[], Iterator[str]]]]) -> Iterator[str]:
+    """
+    Streaming counterpart of ``route``: yields text chunks from the first
+    available backend. A backend that fails before its first chunk is skipped
+    for the next one; once chunks have been handed out, failures propagate.
+    """
+    errors: List[Exception] = []
+    remaining = iter(backends)
+    while (candidate := _next_available(remaining)) is not None:
+        name, open_stream = candidate
+        breaker = get_breaker(name)
+        started = time.monotonic()
+        with span("llm_backend", backend=name, stream=True):
+            chunks = open_stream()
+            try:
+                # The limiter's retries happen before the first chunk
+                with attempt_timer() as timer:
+                    first = next(chunks, None)
+            except LLMRateLimited as e:
+                breaker.record_throttled()
+                print(f"{name} LLM Error: {e}")
+                errors.append(e)
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                print(f"{name} LLM Error: {e}")
+                errors.append(e)
+                continue
+            try:
+                if first is not None:
+                    yield first
+                    yield from chunks
+            except GeneratorExit:
+                # Client went away; the backend did nothing wrong
+                chunks.close()
+                breaker.record_success(_elapsed(timer, started))
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            breaker.record_success(_elapsed(timer, started))
+            return
+    if errors:
+        raise errors[-1]
+    raise RuntimeError(f"All LLM backends unavailable ({', '.join(name for name, _ in backends)})")
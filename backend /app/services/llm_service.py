@@ -1,10 +1,11 @@
 import os
 import json
-import requests
 import re
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+from app.services.http_clients import get_async_client
+
 load_dotenv()
 
 class LLMService:
@@ -127,7 +128,7 @@ Provide your analysis in the following JSON format:
             "messages": messages
         }
 
-        response = requests.post(
+        response = await get_async_client("github").post(
             self.api_url,
             headers=self.headers,
             json=payload
@@ -0,0 +1,141 @@
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.services.profiling import span
+
+# ----------------------------
+# Extraction pipeline metrics
+# ----------------------------
+# Stage timings and error counts in Prometheus format, served at /metrics.
+# Recording is a perf_counter pair and one histogram observe per stage, cheap
+# enough to leave on everywhere.
+#
+# Stages: download, decode, pdf_text, rasterize, ocr, llm, parse, mask
+
+_STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "ocr_stage_duration_seconds",
+    "Time spent in each extraction pipeline stage",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "ocr_llm_request_duration_seconds",
+    "LLM chat completion latency, including limiter waits and retries",
+    ["backend", "model"],
+    buckets=_STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "ocr_stage_errors_total",
+    "Exceptions raised out of an extraction pipeline stage",
+    ["stage", "doc_type"],
+)
+
+# Doc type of the extraction running in this context, for error labels in
+# stages that don't know it (LLM calls, OCR)
+_doc_type: contextvars.ContextVar[str] = contextvars.ContextVar("ocr_doc_type", default="unknown")
+
+
+@contextmanager
+def doc_type_scope(doc_type: str) -> Iterator[None]:
+    token = _doc_type.set(doc_type)
+    try:
+        yield
+    finally:
+        _doc_type.reset(token)
+
+
+@contextmanager
+def stage(name: str, doc_type: Optional[str] = None, **attrs: Any) -> Iterator[None]:
+    """Time a stage into the histograms and, when profiling, the request timeline."""
+    started = time.perf_counter()
+    try:
+        with span(name, **attrs):
+            yield
+    except Exception:
+        STAGE_ERRORS.labels(name, doc_type or _doc_type.get()).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of ``stage``."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def llm_call(backend: str, model: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        with stage("llm", backend=backend, model=model):
+            yield
+    finally:
+        LLM_SECONDS.labels(backend, model).observe(time.perf_counter() - started)
+
+
+class _ServiceCollector:
+    """Gauges and counters read at scrape time from the caches, LLM limiters and breakers."""
+
+    def collect(self):
+        from app.services.extraction_cache import extraction_cache
+        from app.services.llm_limiter import limiter_stats
+        from app.services.llm_routing import breaker_stats
+        from app.services.url_fetcher import fetch_stats
+
+        cache = extraction_cache.stats()
+        entries = GaugeMetricFamily("ocr_cache_entries", "Extraction results held in memory")
+        entries.add_metric([], cache["entries"])
+        yield entries
+        # Cumulative counts are counters (exposed as *_total) so rate() works on them
+        lookups = CounterMetricFamily("ocr_cache_lookups", "Extraction cache lookups by outcome", labels=["outcome"])
+        for outcome in ("memory_hits", "disk_hits", "misses"):
+            lookups.add_metric([outcome], cache[outcome])
+        yield lookups
+
+        fetches = CounterMetricFamily("ocr_fetch_lookups", "URL document fetches by cache outcome", labels=["outcome"])
+        for outcome, count in fetch_stats().items():
+            if outcome != "enabled":
+                fetches.add_metric([outcome], count)
+        yield fetches
+
+        limits = limiter_stats()
+        for key, help_text in (
+            ("in_flight", "LLM calls in flight"),
+            ("queue_depth", "Callers waiting for an LLM slot"),
+            ("wait_ms_avg", "Average wait for an LLM slot in milliseconds"),
+        ):
+            gauge = GaugeMetricFamily(f"ocr_llm_limiter_{key}", help_text, labels=["backend"])
+            for backend, stats in limits.items():
+                gauge.add_metric([backend], stats[key])
+            yield gauge
+        retries = CounterMetricFamily("ocr_llm_limiter_retries", "LLM calls retried after 429/5xx", labels=["backend"])
+        for backend, stats in limits.items():
+            retries.add_metric([backend], stats["retries"])
+        yield retries
+
+        open_gauge = GaugeMetricFamily("ocr_llm_breaker_open", "1 while a backend's circuit is not closed", labels=["backend"])
+        for backend, stats in breaker_stats().items():
+            open_gauge.add_metric([backend], 0 if stats["state"] == "closed" else 1)
+        yield open_gauge
+
+
+REGISTRY.register(_ServiceCollector())
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
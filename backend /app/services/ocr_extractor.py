@@ -1,16 +1,33 @@
 import os
 import base64
+import copy
+import hashlib
+import time
+import math
+import tempfile
+import threading
+import contextvars
 from io import BytesIO
-from typing import List, Dict, Any
-import requests
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import re
 import json
-import pdfplumber
-from pdf2image import convert_from_bytes
 from dotenv import load_dotenv
-from paddleocr import PaddleOCR
-import cv2
-import numpy as np
+
+from app.services.http_clients import get_client
+from app.services.json_stream import JSONFieldStream
+from app.services.llm_limiter import LLMRateLimited, send_limited, stream_limited
+from app.services.llm_payload import image_part, json_request
+from app.services.llm_routing import call_backend, route, stream_route
+from app.services.metrics import doc_type_scope, llm_call, stage, timed
+from app.services.profiling import profiled, span
+from app.services.extraction_cache import extraction_cache, ExtractionCache
+from app.services.image_preprocess import normalize_image
+from app.services.url_fetcher import fetch_document_sync
+from app.services.engines import get_engine
+from app.services.pdf_text import config_key as pdf_text_config, extract_text as extract_pdf_text
+from app.services.id_validators import REQUIRED_FIELDS, extract_fields, age_from_dob
+from app.core.config import settings
 
 # Load environment variables once
 load_dotenv()
@@ -112,17 +129,65 @@ _VOTER_ID_PROMPT = (
 
 
 # ----------------------------
-# OCR init
+# OCR
 # ----------------------------
-_ocr_model = PaddleOCR(use_angle_cls=True, lang='en')
-
-def _ocr_image(file_bytes: bytes) -> str:
+# PaddleOCR and OpenCV are loaded on first use, see app/services/engines.py
+def _is_ocr_line(entry: Any) -> bool:
+    # A detected line is [box, (text, confidence)]
+    return (
+        isinstance(entry, (list, tuple)) and len(entry) == 2
+        and isinstance(entry[1], (list, tuple)) and len(entry[1]) == 2
+        and isinstance(entry[1][0], str)
+    )
+
+@timed("ocr")
+def _ocr_lines(file_bytes: bytes) -> List[Tuple[str, float]]:
+    import numpy as np
+    cv2 = get_engine("cv2")
     nparr = np.frombuffer(file_bytes, np.uint8)
     img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    ocr_result = _ocr_model.ocr(img)
-    extracted_text = "\n".join([line[1][1] for line in ocr_result])
+    ocr_result = get_engine("paddleocr").ocr(img) or []
+    # PaddleOCR >= 2.6 nests the lines in one list per input image
+    if ocr_result and not _is_ocr_line(ocr_result[0]):
+        ocr_result = ocr_result[0] or []
+    return [(line[1][0], float(line[1][1])) for line in ocr_result if _is_ocr_line(line)]
+
+def _ocr_image(file_bytes: bytes) -> str:
+    extracted_text = "\n".join([text for text, _ in _ocr_lines(file_bytes)])
     return extracted_text
 
+# ----------------------------
+# Local fast path
+# ----------------------------
+def _prompt_schema(prompt_template: str) -> Dict[str, Any]:
+    # Each prompt embeds its output template as a JSON object
+    return json.loads(prompt_template[prompt_template.index("{"):prompt_template.rindex("}") + 1])
+
+def _fast_path_fields(image_bytes: bytes, doc_type: str, prompt_template: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Read an ID card with local OCR and the field validators.
+
+    Returns the prompt's schema filled with every field that validated, and
+    the fields the LLM still has to supply. That list is empty once the
+    REQUIRED_FIELDS validate: the validators never read fields such as
+    addresses, which are left blank rather than paying for an LLM call.
+    """
+    started = time.perf_counter()
+    schema = _prompt_schema(prompt_template)
+    validated = extract_fields(_ocr_lines(image_bytes), doc_type, settings.OCR_FAST_PATH_MIN_CONFIDENCE)
+    data = {**schema, **validated}
+    if "date_of_birth" in validated and "age" in schema:
+        age = age_from_dob(validated["date_of_birth"])
+        data["age"] = age if isinstance(schema["age"], int) else str(age)
+        validated["age"] = data["age"]
+
+    missing = [key for key in schema if key not in validated and key != "type"]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"[DEBUG] Fast path {doc_type}: validated={sorted(validated)} in {elapsed_ms:.0f}ms")
+    if all(key in validated for key in REQUIRED_FIELDS[doc_type]):
+        return data, []
+    return data, missing
+
 # ----------------------------
 # LLM routing
 # ----------------------------
@@ -141,13 +206,14 @@ def _send_to_github(content_list: List[Dict[str, Any]], model: str, max_tokens:
         ],
         "max_tokens": max_tokens,
     }
-    resp = requests.post(_GITHUB_API_URL, headers=headers, json=payload, timeout=120)
-    print(f"[DEBUG] GitHub API status: {resp.status_code}")
-    if resp.status_code != 200:
-        print(f"[DEBUG] GitHub API error response: {resp.text}")
-        raise RuntimeError(f"GITHUB LLM API error: {resp.text}")
-    data = resp.json()
-    result = data["choices"][0]["message"]["content"]
+    with llm_call("github", model):
+        resp = send_limited("github", payload, lambda: get_client("github").post(_GITHUB_API_URL, **json_request(headers, payload)))
+        print(f"[DEBUG] GitHub API status: {resp.status_code}")
+        if resp.status_code != 200:
+            print(f"[DEBUG] GitHub API error response: {resp.text}")
+            raise RuntimeError(f"GITHUB LLM API error: {resp.text}")
+        data = resp.json()
+        result = data["choices"][0]["message"]["content"]
     print(f"[DEBUG] GitHub API response length: {len(result)} chars")
     return result
 
@@ -166,29 +232,33 @@ def _send_to_ollama(content_list: List[Dict[str, Any]], model: str, max_tokens:
         "max_tokens": max_tokens,
     }
     url = f"{_OLLAMA_BASE_URL.rstrip('/')}/chat/completions"
-    resp = requests.post(url, headers=headers, json=payload, timeout=120)
-    if resp.status_code != 200:
-        raise RuntimeError(f"OLLAMA LLM API error: {resp.text}")
-    data = resp.json()
-    return data["choices"][0]["message"]["content"]
-
-def _switch_models(content_list: List[Dict[str, Any]], model: str = _DEFAULT_MODEL, max_tokens: int = 4000, temperature: float = 0.3) -> str:
+    with llm_call("ollama", model):
+        resp = send_limited("ollama", payload, lambda: get_client("ollama").post(url, **json_request(headers, payload)))
+        if resp.status_code != 200:
+            raise RuntimeError(f"OLLAMA LLM API error: {resp.text}")
+        data = resp.json()
+        return data["choices"][0]["message"]["content"]
+
+def _switch_models(content_list: List[Dict[str, Any]], model: str = _DEFAULT_MODEL, max_tokens: int = 4000, temperature: float = 0.3,
+                   multi_image: bool = False) -> str:
+    # With multi_image, backends that take one image per message are left out
+    # (returning "" when none is left) instead of being sent a request they reject
+    ollama_ok = not multi_image or settings.LLM_OLLAMA_MULTI_IMAGE
     if _OCR_LLM_BACKEND == "github":
-        return _send_to_github(content_list, model, max_tokens, temperature)
+        return call_backend("github", lambda: _send_to_github(content_list, model, max_tokens, temperature))
     if _OCR_LLM_BACKEND == "ollama":
-        return _send_to_ollama(content_list, _OLLAMA_MODEL, max_tokens, temperature)
+        if not ollama_ok:
+            return ""
+        return call_backend("ollama", lambda: _send_to_ollama(content_list, _OLLAMA_MODEL, max_tokens, temperature))
 
+    backends = []
     if _GITHUB_API_KEY:
-        try:
-            return _send_to_github(content_list, model, max_tokens, temperature)
-        except Exception as e:
-            print(f"GitHub LLM Error: {e}")
-            pass
-    try:
-        return _send_to_ollama(content_list, _OLLAMA_MODEL, max_tokens, temperature)
-    except Exception as e:
-        print(f"Ollama LLM Error: {e}")
+        backends.append(("github", lambda: _send_to_github(content_list, model, max_tokens, temperature)))
+    if ollama_ok:
+        backends.append(("ollama", lambda: _send_to_ollama(content_list, _OLLAMA_MODEL, max_tokens, temperature)))
+    if not backends:
         return ""
+    return route(backends, hedge=settings.LLM_HEDGE)
 
 # ----------------------------
 # Prompt selection
@@ -254,6 +324,138 @@ def _build_prompt(doc_type: str) -> str:
 
     raise ValueError("Unsupported document type")
 
+def is_supported_doc_type(doc_type: str) -> bool:
+    """Whether _build_prompt resolves a prompt for doc_type in this build."""
+    try:
+        _build_prompt(doc_type)
+    except (ValueError, NameError):
+        # NameError: the branch names a prompt that isn't bundled here
+        return False
+    return True
+
+# ----------------------------
+# PDF rasterization
+# ----------------------------
+# ID cards are small, high-contrast documents; they don't need 300 DPI
+_PDF_DPI_BY_TYPE = {
+    "ind_pan": 200,
+    "comp_pan": 200,
+    "ind_aadhaar": 200,
+    "ind_aadhar": 200,
+    "ind_voterid": 200,
+    "ind_driving_license": 200,
+}
+
+def _pdf_dpi(doc_type: str) -> int:
+    return _PDF_DPI_BY_TYPE.get(doc_type, settings.OCR_PDF_DPI)
+
+class _RasterBudget:
+    """
+    Bytes of rasterized pages held across the whole process. Every request
+    reserves a page's pixels before rasterizing it and releases them once the
+    page's LLM call is done, so concurrent jobs share OCR_RASTER_MAX_MB
+    instead of each getting their own.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int) -> None:
+        with self._cond:
+            # An idle budget always admits one page, whatever its size
+            self._cond.wait_for(lambda: self.used == 0 or self.used + nbytes <= self.capacity)
+            self.used += nbytes
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+_raster_budget = _RasterBudget(settings.OCR_RASTER_MAX_MB * 1024 * 1024)
+
+def _page_size(value: Any) -> Optional[Tuple[float, float]]:
+    # pdfinfo reports "612 x 792 pts (letter)"
+    match = re.match(r"\s*([\d.]+) x ([\d.]+)", str(value or ""))
+    return (float(match.group(1)) / 72, float(match.group(2)) / 72) if match else None
+
+def _page_sizes(pdf_path: str, numbers: List[int]) -> Dict[int, Tuple[float, float]]:
+    """Size in inches of each page in ``numbers``, from one ranged pdfinfo call."""
+    if not numbers:
+        return {}
+    info = get_engine("pdf2image").pdfinfo_from_path(pdf_path, first_page=min(numbers), last_page=max(numbers))
+    sizes = {}
+    for key, value in info.items():
+        match = re.match(r"Page\s+(\d+) size", key)
+        size = _page_size(value) if match else None
+        if size:
+            sizes[int(match.group(1))] = size
+    return sizes
+
+def _raster_bytes(size: Tuple[float, float], dpi: int) -> int:
+    # RGB pixels of one page
+    return int(size[0] * dpi) * int(size[1] * dpi) * 3
+
+def _raster_dpi(size: Optional[Tuple[float, float]], dpi: int) -> int:
+    """
+    Downgrade (or reject) a DPI whose raster would exceed one page's share of
+    the memory budget, so OCR_PAGE_CONCURRENCY pages fit in it at once.
+    """
+    if size is None:
+        return dpi
+    share = settings.OCR_RASTER_MAX_MB * 1024 * 1024 // settings.OCR_PAGE_CONCURRENCY
+    if _raster_bytes(size, dpi) <= share:
+        return dpi
+    reduced = int(dpi * math.sqrt(share / _raster_bytes(size, dpi)))
+    if settings.OCR_RASTER_OVERSIZE == "reject" or reduced < settings.OCR_PDF_MIN_DPI:
+        raise ValueError(
+            f"PDF page too large to rasterize ({size[0]:.1f}x{size[1]:.1f} in at {dpi} DPI)"
+        )
+    print(f"[DEBUG] Oversized PDF page, rasterizing at {reduced} DPI instead of {dpi}")
+    return reduced
+
+def _iter_pdf_pages(file_bytes: bytes, doc_type: str, numbers: Optional[List[int]] = None,
+                    budget: Optional[_RasterBudget] = None):
+    """
+    Yield (page_number, PIL image, raster bytes) one page at a time so only
+    the pages currently being processed are held in memory. ``numbers``
+    (1-based) limits rasterization to those pages; by default every page is
+    read. Each page's DPI is checked against its own size. With ``budget``,
+    a page's bytes are reserved before it is rasterized and the caller
+    releases them when done with it.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        tmp.write(file_bytes)
+        tmp.flush()
+        info = get_engine("pdf2image").pdfinfo_from_path(tmp.name)
+        num_pages = int(info.get("Pages", 0))
+        if numbers is None:
+            numbers = list(range(1, num_pages + 1))
+        numbers = [n for n in numbers if 1 <= n <= num_pages]
+        if len(numbers) > settings.OCR_PDF_MAX_PAGES:
+            print(f"[DEBUG] PDF has {len(numbers)} pages to rasterize, processing first {settings.OCR_PDF_MAX_PAGES}")
+            numbers = numbers[:settings.OCR_PDF_MAX_PAGES]
+        sizes = _page_sizes(tmp.name, numbers)
+        base_dpi = _pdf_dpi(doc_type)
+        for number in numbers:
+            size = sizes.get(number) or _page_size(info.get("Page size"))
+            dpi = _raster_dpi(size, base_dpi)
+            nbytes = _raster_bytes(size, dpi) if size else 0
+            if budget:
+                budget.acquire(nbytes)
+            try:
+                with stage("rasterize"):
+                    pages = get_engine("pdf2image").convert_from_path(tmp.name, dpi=dpi, first_page=number, last_page=number)
+            except BaseException:
+                if budget:
+                    budget.release(nbytes)
+                raise
+            if pages:
+                yield number, pages[0], nbytes
+            elif budget:
+                budget.release(nbytes)
+
 # ----------------------------
 # Auto-detection
 # ----------------------------
@@ -275,14 +477,8 @@ def _detect_type_from_bytes(file_bytes: bytes, filename: str) -> str:
     ext = filename.lower().split(".")[-1] if "." in filename else ""
     text_blob = ""
     if ext == "pdf":
-        is_text_pdf = False
-        extracted_text = ""
-        with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text and text.strip():
-                    is_text_pdf = True
-                    extracted_text += text + "\n"
+        extracted_text = extract_pdf_text(file_bytes, "classify").text
+        is_text_pdf = bool(extracted_text)
 
     if is_text_pdf:
         # Normal searchable PDF
@@ -293,11 +489,11 @@ def _detect_type_from_bytes(file_bytes: bytes, filename: str) -> str:
         return _switch_models(content_list)
     else:
         # Scanned PDF → run OCR instead of sending image to LLM
-        pages = convert_from_bytes(file_bytes, dpi=300)
         extracted_text = ""
-        for page in pages:
+        for _, page, _ in _iter_pdf_pages(file_bytes, "classify"):
             buffered = BytesIO()
             page.save(buffered, format="JPEG")
+            page.close()
             ocr_text = _ocr_image(buffered.getvalue())
             extracted_text += ocr_text + "\n"
 
@@ -311,166 +507,516 @@ def _detect_type_from_bytes(file_bytes: bytes, filename: str) -> str:
 # ----------------------------
 # Extraction core
 # ----------------------------
-def _extract_from_bytes(file_bytes: bytes, filename: str, doc_type: str) -> Any:
-    print(f"[DEBUG] _extract_from_bytes called: filename={filename}, doc_type={doc_type}, bytes_len={len(file_bytes)}")
-    ext = filename.lower().split(".")[-1] if "." in filename else ""
-    prompt_template = _build_prompt(doc_type)
-    print(f"[DEBUG] File extension: {ext}, Prompt template length: {len(prompt_template)}")
-
-    def _mask_pii(data: Dict[str, Any]) -> Dict[str, Any]:
-        """Mask sensitive PII data like PAN and Bank Account numbers."""
-        if not isinstance(data, dict):
-            return data
-        
-        # Helper to mask string: keep last 4 chars
-        def mask_str(s: str, visible_chars: int = 4) -> str:
-            if not s: return s
-            val = str(s)
-            if len(val) <= visible_chars:
-                return "X" * len(val)
-            return "X" * (len(val) - visible_chars) + val[-visible_chars:]
-
-        # PAN Masking
-        if "pan_no" in data:
-            data["pan_no"] = mask_str(data["pan_no"], 4)
-
-        # Aadhaar Masking
-        if "aadhar_no" in data:
-            data["aadhar_no"] = mask_str(data["aadhar_no"], 4)
-            
-        # Voter ID Masking
-        if "voter_id" in data:
-            data["voter_id"] = mask_str(data["voter_id"], 4)
-
-        # Bank Account & IFSC Masking
-        # Bank Account
-        for key in ["account_number", "account_no", "bank_account_number", "acc_no", "bank_account"]:
-            if key in data:
-                data[key] = mask_str(data[key], 4)
-        
-        # IFSC
-        for key in ["ifsc", "ifsc_code", "bank_ifsc"]:
-            if key in data:
-                val = str(data[key])
-                # Mask middle part? e.g. HDFC0XXXXXX
-                if len(val) > 4:
-                     data[key] = val[:4] + "X" * (len(val) - 4)
-                else:
-                     data[key] = mask_str(val, 0) # Mask all if short
-        
+# Shared by every request, so it bounds concurrent page LLM calls globally.
+# Kept separate from the job executor to avoid waiting on our own pool.
+_page_executor = ThreadPoolExecutor(max_workers=settings.OCR_PAGE_CONCURRENCY, thread_name_prefix="ocr-page")
+
+@timed("mask")
+def _mask_pii(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Mask sensitive PII data like PAN and Bank Account numbers."""
+    if not isinstance(data, dict):
         return data
+    
+    # Helper to mask string: keep last 4 chars
+    def mask_str(s: str, visible_chars: int = 4) -> str:
+        if not s: return s
+        val = str(s)
+        if len(val) <= visible_chars:
+            return "X" * len(val)
+        return "X" * (len(val) - visible_chars) + val[-visible_chars:]
+
+    # PAN Masking
+    if "pan_no" in data:
+        data["pan_no"] = mask_str(data["pan_no"], 4)
+
+    # Aadhaar Masking
+    if "aadhar_no" in data:
+        data["aadhar_no"] = mask_str(data["aadhar_no"], 4)
+        
+    # Voter ID Masking
+    if "voter_id" in data:
+        data["voter_id"] = mask_str(data["voter_id"], 4)
+
+    # Bank Account & IFSC Masking
+    # Bank Account
+    for key in ["account_number", "account_no", "bank_account_number", "acc_no", "bank_account"]:
+        if key in data:
+            data[key] = mask_str(data[key], 4)
+    
+    # IFSC
+    for key in ["ifsc", "ifsc_code", "bank_ifsc"]:
+        if key in data:
+            val = str(data[key])
+            # Mask middle part? e.g. HDFC0XXXXXX
+            if len(val) > 4:
+                 data[key] = val[:4] + "X" * (len(val) - 4)
+            else:
+                 data[key] = mask_str(val, 0) # Mask all if short
+    
+    return data
 
-    def _process_llm_json(json_str: str) -> Any:
-        # Parse, mask, return dict
-        try:
+def _process_llm_json(json_str: str) -> Any:
+    # Parse, mask, return dict
+    try:
+        with stage("parse"):
             cleaned = _clean_gpt_json(json_str)
             data = json.loads(cleaned)
-            return _mask_pii(data)
-        except Exception as e:
-            print(f"Error masking JSON: {e}")
-            return json_str
+        return _mask_pii(data)
+    except Exception as e:
+        print(f"Error masking JSON: {e}")
+        return json_str
+
+def _cache_key(file_digest: str, doc_type: str, variant: str = "") -> str:
+    # Model identity covers whichever backend may answer; prompt version is
+    # the digest of the prompt so edits to a template invalidate its entries.
+    model = f"{_OCR_LLM_BACKEND}:{_DEFAULT_MODEL}:{_OLLAMA_MODEL}:fast={settings.OCR_FAST_PATH}{variant}"
+    # PDF text engine, pages and budget change what the LLM sees
+    model += f":text={pdf_text_config(doc_type)}"
+    prompt_version = hashlib.sha256(_build_prompt(doc_type).encode()).hexdigest()[:12]
+    return ExtractionCache.make_key(file_digest, doc_type, model, prompt_version)
+
+def _is_cacheable(result: Any) -> bool:
+    # Only parsed results; raw strings mean the LLM call or JSON parse failed
+    if isinstance(result, dict):
+        return True
+    if isinstance(result, list):
+        try:
+            return bool(result) and all(isinstance(json.loads(r["json"]), dict) for r in result)
+        except (KeyError, TypeError, ValueError):
+            return False
+    return False
+
+def _extract_from_bytes(file_bytes: bytes, filename: str, doc_type: str, file_digest: Optional[str] = None) -> Any:
+    """
+    Extract a document, served from the result cache when possible.
+
+    ``file_bytes`` may be any bytes-like buffer (e.g. an mmap of an upload);
+    pass ``file_digest`` when its SHA-256 is already known to skip rehashing.
+    """
+    with doc_type_scope(doc_type), profiled("extract"), \
+            span("extract", doc_type=doc_type, bytes=len(file_bytes)) as info:
+        if not settings.OCR_CACHE_ENABLED:
+            return _extract_uncached(file_bytes, filename, doc_type)
+
+        key = _cache_key(file_digest or hashlib.sha256(file_bytes).hexdigest(), doc_type)
+        cached = extraction_cache.get(key)
+        info["cache"] = "hit" if cached is not None else "miss"
+        if cached is not None:
+            print(f"[DEBUG] Extraction cache hit: doc_type={doc_type}")
+            return cached
+
+        result = _extract_uncached(file_bytes, filename, doc_type)
+        if _is_cacheable(result):
+            extraction_cache.put(key, result)
+        return result
+
+def _extract_uncached(file_bytes: bytes, filename: str, doc_type: str) -> Any:
+    print(f"[DEBUG] _extract_from_bytes called: filename={filename}, doc_type={doc_type}, bytes_len={len(file_bytes)}")
+    ext = filename.lower().split(".")[-1] if "." in filename else ""
+    prompt_template = _build_prompt(doc_type)
+    print(f"[DEBUG] File extension: {ext}, Prompt template length: {len(prompt_template)}")
 
     if ext == "pdf":
-        is_text_pdf = False
-        extracted_text = ""
-        with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text and text.strip():
-                    is_text_pdf = True
-                    extracted_text += text + "\n"
-
-        if is_text_pdf:
+        # Pages are routed one by one: those with a text layer go to the LLM
+        # together as one text prompt, and only image-only pages are
+        # rasterized and sent as images
+        with stage("pdf_text"):
+            layer = extract_pdf_text(file_bytes, doc_type)
+
+        if layer.text and not layer.scanned_pages:
             content_list = [
                 {"type": "text", "text": prompt_template},
-                {"type": "text", "text": extracted_text},
+                {"type": "text", "text": layer.text},
             ]
             raw_json = _switch_models(content_list)
             return _process_llm_json(raw_json)
         else:
-            pages = convert_from_bytes(file_bytes, dpi=300)
-            results: List[Dict[str, Any]] = []
-            for i, page in enumerate(pages):
-                buffered = BytesIO()
-                page.save(buffered, format="JPEG")
-                image_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-                content_list = [
-                    {"type": "text", "text": prompt_template},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}},
-                ]
-                raw_json = _switch_models(content_list)
+            def _page_result(started: float, raw_json: str, **page: Any) -> Dict[str, Any]:
                 masked_data = _process_llm_json(raw_json)
                 # Convert back to string for consistency with existing list structure
                 masked_str = json.dumps(masked_data) if isinstance(masked_data, dict) else str(masked_data)
-                results.append({"page": i + 1, "json": masked_str})
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                return {**page, "json": masked_str, "elapsed_ms": elapsed_ms}
+
+            def _extract_text_pages() -> Dict[str, Any]:
+                with span("text_pages", pages=len(layer.text_pages)):
+                    started = time.perf_counter()
+                    content_list = [
+                        {"type": "text", "text": prompt_template},
+                        {"type": "text", "text": layer.text},
+                    ]
+                    raw_json = _switch_models(content_list)
+                    return _page_result(started, raw_json, page=layer.text_pages[0], pages=layer.text_pages)
+
+            def _extract_page(number: int, page) -> Dict[str, Any]:
+                # Own timeline span per page (and a profile when sampled)
+                with profiled(f"page{number}"), span("page", page=number):
+                    started = time.perf_counter()
+                    buffered = BytesIO()
+                    page.save(buffered, format="JPEG")
+                    page.close()
+                    # Encoded into the request body as it is sent
+                    content_list = [
+                        {"type": "text", "text": prompt_template},
+                        image_part(buffered.getbuffer(), "image/jpeg"),
+                    ]
+                    raw_json = _switch_models(content_list)
+                    return _page_result(started, raw_json, page=number)
+
+            # Pages go out concurrently on the shared page pool, whose size is
+            # the process-wide cap on in-flight page LLM calls. The raster
+            # budget, shared by all requests, stops rasterizing ahead of that
+            # pool, so memory stays within OCR_RASTER_MAX_MB.
+            started = time.perf_counter()
+            futures = []
+            if layer.text:
+                # Mixed PDF: the text pages' call runs alongside the scanned ones
+                futures.append(_page_executor.submit(contextvars.copy_context().run, _extract_text_pages))
+            for number, page, nbytes in _iter_pdf_pages(file_bytes, doc_type, layer.scanned_pages, _raster_budget):
+                # The copied context carries the doc type into the page thread
+                future = _page_executor.submit(contextvars.copy_context().run, _extract_page, number, page)
+                future.add_done_callback(lambda _, nbytes=nbytes: _raster_budget.release(nbytes))
+                futures.append(future)
+                del page
+            results: List[Dict[str, Any]] = sorted((f.result() for f in futures), key=lambda r: r["page"])
+            wall_ms = (time.perf_counter() - started) * 1000
+            print(f"[DEBUG] {len(results)} pages in {wall_ms:.0f}ms wall, {sum(r['elapsed_ms'] for r in results):.0f}ms summed")
             return results
 
     print(f"[DEBUG] Processing as image (not PDF)")
-    image_base64 = base64.b64encode(file_bytes).decode("utf-8")
-    print(f"[DEBUG] Image base64 length: {len(image_base64)}")
-    content_list = [
-        {"type": "text", "text": prompt_template},
-        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}},
-    ]
+    content_list, local_data, missing = _image_request(file_bytes, doc_type, prompt_template)
+    if content_list is None:
+        return _mask_pii(local_data)
     result = _switch_models(content_list)
     print(f"[DEBUG] _switch_models returned: {result[:200] if result else 'EMPTY'}...")
+    if local_data:
+        try:
+            with stage("parse"):
+                llm_data = json.loads(_clean_gpt_json(result))
+        except json.JSONDecodeError:
+            llm_data = None
+        if isinstance(llm_data, dict):
+            merged = {**local_data, **{k: v for k, v in llm_data.items() if k in missing}}
+            return _mask_pii(merged)
+    # An empty or unparseable answer stays a raw string, which is not cached
     return _process_llm_json(result)
 
+def _image_request(file_bytes: bytes, doc_type: str, prompt_template: str) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any], List[str]]:
+    """
+    Normalize an image and run the ID-card fast path.
+
+    Returns the LLM content list (None when local OCR validated every field),
+    the fields read locally and the fields the LLM still has to supply.
+    """
+    with span("normalize_image") as info:
+        image_bytes, mime_type, image_stats = normalize_image(file_bytes, doc_type)
+        info.update(bytes_in=image_stats.get("bytes_in"), bytes_out=image_stats.get("bytes_out"))
+    print(f"[DEBUG] Image normalized: {image_stats}")
+
+    # ID cards: trust local OCR when every required field validates, and
+    # otherwise ask the LLM only for the fields that did not
+    local_data: Dict[str, Any] = {}
+    missing: List[str] = []
+    if settings.OCR_FAST_PATH and doc_type in REQUIRED_FIELDS:
+        try:
+            with span("fast_path"):
+                local_data, missing = _fast_path_fields(image_bytes, doc_type, prompt_template)
+        except Exception as e:
+            print(f"Fast path error: {e}")
+            missing = []
+        if local_data and not missing:
+            return None, local_data, []
+        if missing:
+            prompt_template += (
+                "- Only these fields still need to be read; leave every other field empty: "
+                + ", ".join(missing) + "\n"
+            )
+
+    print(f"[DEBUG] Image bytes for LLM: {len(image_bytes)}")
+    content_list = [
+        {"type": "text", "text": prompt_template},
+        image_part(image_bytes, mime_type),
+    ]
+    return content_list, local_data, missing
+
+# ----------------------------
+# Streaming extraction
+# ----------------------------
+def _stream_chat(backend: str, url: str, api_key: str, model: str, content_list: List[Dict[str, Any]], max_tokens: int, temperature: float) -> Iterator[str]:
+    """Text deltas of a ``stream: true`` chat completion (OpenAI SSE format)."""
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "top_p": 1,
+        "messages": [
+            {"role": "user", "content": content_list}
+        ],
+        "max_tokens": max_tokens,
+        "stream": True,
+    }
+    open_stream = lambda: get_client(backend).stream("POST", url, **json_request(headers, payload))
+    with llm_call(backend, model), stream_limited(backend, payload, open_stream) as resp:
+        if resp.status_code != 200:
+            resp.read()
+            raise RuntimeError(f"{backend.upper()} LLM API error: {resp.text}")
+        for line in resp.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                delta = json.loads(data)["choices"][0]["delta"].get("content")
+            except (ValueError, KeyError, IndexError, TypeError):
+                # Keep-alives, usage-only and content-filter chunks
+                continue
+            if delta:
+                yield delta
+
+def _stream_models(content_list: List[Dict[str, Any]], model: str = _DEFAULT_MODEL, max_tokens: int = 4000, temperature: float = 0.3) -> Iterator[str]:
+    github = ("github", lambda: _stream_chat("github", _GITHUB_API_URL, _GITHUB_API_KEY, model, content_list, max_tokens, temperature))
+    ollama_url = f"{_OLLAMA_BASE_URL.rstrip('/')}/chat/completions"
+    ollama = ("ollama", lambda: _stream_chat("ollama", ollama_url, _OLLAMA_API_KEY, _OLLAMA_MODEL, content_list, max_tokens, temperature))
+    if _OCR_LLM_BACKEND == "github":
+        backends = [github]
+    elif _OCR_LLM_BACKEND == "ollama":
+        backends = [ollama]
+    else:
+        backends = ([github] if _GITHUB_API_KEY else []) + [ollama]
+    return stream_route(backends)
+
+def _as_fields(raw: Any) -> Optional[Dict[str, Any]]:
+    # Any extraction result as one flat dict of fields
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, list):
+        return _merge_pages(raw) or None
+    try:
+        data = json.loads(_clean_gpt_json(str(raw)))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def stream_extract_fields(file_bytes: bytes, filename: str, doc_type: str, file_digest: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Extract a document as a sequence of events for streaming clients:
+    ``{"field": name, "value": masked value}`` as each field completes, then
+    ``{"done": True, "data": masked result}`` (or ``{"error": ...}``).
+
+    Images are streamed from the LLM and parsed incrementally. PDFs and cache
+    hits are extracted whole and replayed field by field.
+    """
+    with doc_type_scope(doc_type), span("extract", doc_type=doc_type, bytes=len(file_bytes), stream=True) as info:
+        key = None
+        if settings.OCR_CACHE_ENABLED:
+            key = _cache_key(file_digest or hashlib.sha256(file_bytes).hexdigest(), doc_type)
+        cached = extraction_cache.get(key) if key else None
+        info["cache"] = "hit" if cached is not None else "miss"
+        is_pdf = filename.lower().endswith(".pdf") or bytes(file_bytes[:4]) == b"%PDF"
+        if cached is not None or is_pdf:
+            raw = cached if cached is not None else _extract_from_bytes(file_bytes, filename, doc_type, file_digest)
+            data = _as_fields(raw)
+            if data is None:
+                yield {"error": "unable_to_parse"}
+                return
+            for name, value in data.items():
+                yield {"field": name, "value": value}
+            yield {"done": True, "data": data}
+            return
+
+        content_list, local_data, missing = _image_request(file_bytes, doc_type, _build_prompt(doc_type))
+        # Fast-path fields are known before the LLM is even called
+        local_fields = {k: v for k, v in local_data.items() if k not in missing}
+        for name, value in _mask_pii(dict(local_fields)).items():
+            yield {"field": name, "value": value}
+
+        llm_fields: Dict[str, Any] = {}
+        if content_list is not None:
+            # With a partial fast path, only the missing fields come from the LLM
+            wanted = lambda name: not local_data or name in missing
+            parser = JSONFieldStream()
+            for chunk in _stream_models(content_list):
+                for name, value in parser.feed(chunk):
+                    if wanted(name):
+                        llm_fields[name] = value
+                        yield {"field": name, "value": _mask_pii({name: value})[name]}
+
+            try:
+                with stage("parse"):
+                    full = json.loads(_clean_gpt_json(parser.text()))
+            except ValueError:
+                full = None
+            if not isinstance(full, dict):
+                yield {"error": "unable_to_parse"}
+                return
+            # Anything the incremental parser couldn't place
+            for name, value in full.items():
+                if name not in llm_fields and wanted(name):
+                    llm_fields[name] = value
+                    yield {"field": name, "value": _mask_pii({name: value})[name]}
+
+        data = _mask_pii({**local_data, **llm_fields})
+        if key:
+            extraction_cache.put(key, data)
+        yield {"done": True, "data": data}
+
+# ----------------------------
+# Batched multi-image extraction
+# ----------------------------
+def _extract_image_group(group: List[Tuple[bytes, str]], doc_type: str) -> Optional[Dict[str, Any]]:
+    """
+    One chat completion for several normalized images of the same document.
+    Returns the masked merged JSON, or None when no backend gave one JSON
+    object (no multi-image backend, a rejected request, an unparseable
+    answer) so the caller falls back to per-image calls. Throttling
+    propagates: retrying per image would only repeat it N times.
+    """
+    prompt_template = _build_prompt(doc_type) + (
+        f"- The {len(group)} images are different sides or pages of the same document; "
+        "combine them into ONE JSON object.\n"
+    )
+    content_list: List[Dict[str, Any]] = [{"type": "text", "text": prompt_template}]
+    for image_bytes, mime_type in group:
+        content_list.append(image_part(image_bytes, mime_type))
+
+    try:
+        result = _switch_models(content_list, multi_image=True)
+    except LLMRateLimited:
+        raise
+    except Exception as e:
+        print(f"Batched extraction failed, falling back to per-image calls: {e}")
+        return None
+    if not result:
+        print("No backend answered the batched extraction, falling back to per-image calls")
+        return None
+    try:
+        with stage("parse"):
+            data = json.loads(_clean_gpt_json(result))
+    except ValueError as e:
+        print(f"Batched extraction unparseable, falling back to per-image calls: {e}")
+        return None
+    return _mask_pii(data) if isinstance(data, dict) else None
+
+def _extract_batch_from_bytes(files: List[Tuple[bytes, str]], doc_type: str) -> List[Any]:
+    """
+    Extract several files of one doc_type with as few LLM calls as possible.
+
+    Consecutive images are packed into groups bounded by OCR_BATCH_MAX_IMAGES
+    and OCR_BATCH_MAX_BYTES, and each group yields one merged result. PDFs,
+    single images and groups whose answer isn't one JSON object go through
+    _extract_from_bytes per file, so results keep the input order.
+    """
+    with doc_type_scope(doc_type):
+        return _extract_batch(files, doc_type)
+
+def _extract_batch(files: List[Tuple[bytes, str]], doc_type: str) -> List[Any]:
+    results: List[Any] = []
+    group: List[Tuple[bytes, str, bytes, str]] = []
+
+    def flush() -> None:
+        if len(group) > 1:
+            key = _cache_key(":".join(hashlib.sha256(g[0]).hexdigest() for g in group), doc_type, ":batch")
+            cached = extraction_cache.get(key) if settings.OCR_CACHE_ENABLED else None
+            merged = cached or _extract_image_group([(g[2], g[3]) for g in group], doc_type)
+            if merged is not None:
+                if settings.OCR_CACHE_ENABLED and cached is None:
+                    extraction_cache.put(key, merged)
+                results.append(merged)
+                group.clear()
+                return
+        # Per-image calls run side by side on the shared page pool
+        futures = [
+            _page_executor.submit(contextvars.copy_context().run, _extract_from_bytes, g[0], g[1], doc_type)
+            for g in group
+        ]
+        results.extend(f.result() for f in futures)
+        group.clear()
+
+    for file_bytes, filename in files:
+        if filename.lower().endswith(".pdf") or file_bytes[:4] == b"%PDF":
+            flush()
+            results.append(_extract_from_bytes(file_bytes, filename, doc_type))
+            continue
+        image_bytes, mime_type, _ = normalize_image(file_bytes, doc_type)
+        group_bytes = sum(len(g[2]) for g in group)
+        if group and (len(group) >= settings.OCR_BATCH_MAX_IMAGES
+                      or group_bytes + len(image_bytes) > settings.OCR_BATCH_MAX_BYTES):
+            flush()
+        group.append((file_bytes, filename, image_bytes, mime_type))
+    flush()
+    return results
+
 def _extract_from_url(file_url: str, doc_type: str) -> Any:
-    resp = requests.get(file_url, timeout=30)
-    resp.raise_for_status()
-    filename = file_url.split("/")[-1]
-    return _extract_from_bytes(resp.content, filename, doc_type)
+    with stage("download", doc_type):
+        fetched = fetch_document_sync(file_url)
+    return _extract_from_bytes(fetched.content, fetched.filename, doc_type)
 
 # ----------------------------
 # Public API
 # ----------------------------
-def extract_documents(doc_type: str, documents: List[str]) -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
-    for doc in documents:
+def _merge_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Later pages fill in fields earlier ones left empty or missing
+    merged: Dict[str, Any] = {}
+    for r in pages:
+        cleaned = _clean_gpt_json(r.get("json", ""))
         try:
-            if doc.startswith("http://") or doc.startswith("https://"):
-                if doc_type == "auto":
-                    resp = requests.get(doc, timeout=30)
-                    resp.raise_for_status()
-                    filename = doc.split("/")[-1]
-                    detected = _detect_type_from_bytes(resp.content, filename)
-                    if not detected:
-                        raise ValueError("unsupported_document: not Aadhaar / PAN")
-                    raw = _extract_from_bytes(resp.content, filename, detected)
-                else:
-                    raw = _extract_from_url(doc, doc_type)
+            data = json.loads(cleaned)
+            merged.update({k: v for k, v in data.items() if v not in (None, "")})
+        except Exception:
+            pass
+    return merged
+
+def _extract_document(doc_type: str, doc: str) -> Dict[str, Any]:
+    try:
+        if doc.startswith("http://") or doc.startswith("https://"):
+            if doc_type == "auto":
+                with stage("download", doc_type):
+                    fetched = fetch_document_sync(doc)
+                detected = _detect_type_from_bytes(fetched.content, fetched.filename)
+                if not detected:
+                    raise ValueError("unsupported_document: not Aadhaar / PAN")
+                raw = _extract_from_bytes(fetched.content, fetched.filename, detected)
+            else:
+                raw = _extract_from_url(doc, doc_type)
+        else:
+            if doc.startswith("data:"):
+                b64_part = doc.split(",", 1)[1] if "," in doc else ""
             else:
-                if doc.startswith("data:"):
-                    b64_part = doc.split(",", 1)[1] if "," in doc else ""
-                else:
-                    b64_part = doc
+                b64_part = doc
+            with stage("decode", doc_type):
                 file_bytes = base64.b64decode(b64_part)
-                filename = "upload.pdf" if file_bytes[:4] == b"%PDF" else "upload.jpg"
-                if doc_type == "auto":
-                    detected = _detect_type_from_bytes(file_bytes, filename)
-                    if not detected:
-                        raise ValueError("unsupported_document: not Aadhaar / PAN")
-                    raw = _extract_from_bytes(file_bytes, filename, detected)
-                else:
-                    raw = _extract_from_bytes(file_bytes, filename, doc_type)
-
-            if isinstance(raw, list):
-                merged: Dict[str, Any] = {}
-                for r in raw:
-                    cleaned = _clean_gpt_json(r.get("json", ""))
-                    try:
-                        data = json.loads(cleaned)
-                        merged.update({k: v for k, v in data.items() if v not in (None, "")})
-                    except Exception:
-                        pass
-                results.append(merged if merged else {"error": "unable_to_parse"})
+            filename = "upload.pdf" if file_bytes[:4] == b"%PDF" else "upload.jpg"
+            if doc_type == "auto":
+                detected = _detect_type_from_bytes(file_bytes, filename)
+                if not detected:
+                    raise ValueError("unsupported_document: not Aadhaar / PAN")
+                raw = _extract_from_bytes(file_bytes, filename, detected)
             else:
-                cleaned = _clean_gpt_json(str(raw))
-                try:
-                    results.append(json.loads(cleaned))
-                except json.JSONDecodeError:
-                    results.append({"raw": cleaned})
-        except Exception as e:
-            results.append({"error": str(e)})
-    return results
+                raw = _extract_from_bytes(file_bytes, filename, doc_type)
+
+        if isinstance(raw, list):
+            merged = _merge_pages(raw)
+            return merged if merged else {"error": "unable_to_parse"}
+        elif isinstance(raw, dict):
+            return raw
+        else:
+            cleaned = _clean_gpt_json(str(raw))
+            try:
+                return json.loads(cleaned)
+            except json.JSONDecodeError:
+                return {"raw": cleaned}
+    except Exception as e:
+        return {"error": str(e)}
+
+def extract_documents(doc_type: str, documents: List[str]) -> List[Dict[str, Any]]:
+    # Documents are independent, so extract them in parallel (bounded per
+    # request); a document listed twice is only extracted once.
+    unique = list(dict.fromkeys(documents))
+    workers = max(1, min(settings.OCR_DOCUMENT_CONCURRENCY, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(unique, pool.map(lambda doc: _extract_document(doc_type, doc), unique)))
+    return [copy.deepcopy(results[doc]) for doc in documents]
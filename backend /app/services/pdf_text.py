@@ -0,0 +1,187 @@
+import threading
+from io import BytesIO
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple, Union
+
+from app.services.engines import get_engine
+from app.core.config import settings
+
+# ----------------------------
+# Text layer of searchable PDFs
+# ----------------------------
+# pdfplumber's extract_text() runs full layout analysis per character, which
+# costs seconds per 10 pages. PDFium returns the raw text layer about 100x
+# faster and is kept as the default; pdfplumber stays for the doc types whose
+# tables read badly without layout. Only the pages a doc type needs are read,
+# and the text is cut to a token budget before it reaches the LLM. Pages with
+# (next to) no text layer are reported as scanned so the caller can send just
+# those as images.
+
+PdfBytes = Union[bytes, bytearray, memoryview]
+# Given the page count, the 0-based pages to read
+PageSelector = Callable[[int], List[int]]
+# (file, selector) -> (page count, [(page number, text), ...]) for those pages
+Extractor = Callable[[PdfBytes, PageSelector], Tuple[int, List[Tuple[int, str]]]]
+
+# Layout-sensitive documents: column order matters for the figures
+_ENGINE_BY_TYPE = {
+    "financial_statement": "pdfplumber",
+    "gst_return": "pdfplumber",
+    "payslip": "pdfplumber",
+}
+
+# (first N, last M) pages read per doc type; everything else uses the first
+# OCR_PDF_TEXT_MAX_PAGES. Summaries and signatures sit at the ends.
+_PAGES_BY_TYPE = {
+    "form16": (4, 0),
+    "itr": (6, 0),
+    "financial_statement": (5, 3),
+    "rental_agreement": (3, 2),
+    "classify": (2, 0),
+}
+
+# Rough characters per token for budgeting without a tokenizer
+_CHARS_PER_TOKEN = 4
+# Room kept per page for separators and truncation markers
+_MARKER_CHARS = 40
+
+# PDFium is not thread-safe; every call into it goes through this lock
+_pdfium_lock = threading.Lock()
+# Engines whose import failed, reported once
+_unavailable: Set[str] = set()
+
+
+class PdfText(NamedTuple):
+    text: str
+    page_count: int
+    engine: str
+    # 1-based numbers of the selected pages, by whether they have a text layer
+    text_pages: List[int]
+    scanned_pages: List[int]
+
+
+def _pdfium_pages(file_bytes: PdfBytes, select: PageSelector) -> Tuple[int, List[Tuple[int, str]]]:
+    pdfium = get_engine("pypdfium2")
+    # PdfDocument takes bytes or a path, not other buffers
+    data = file_bytes if isinstance(file_bytes, bytes) else bytes(file_bytes)
+    pages = []
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(data)
+        try:
+            count = len(pdf)
+            for number in select(count):
+                page = pdf[number]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+                pages.append((number, text.replace("\r\n", "\n").replace("\r", "\n")))
+        finally:
+            pdf.close()
+    return count, pages
+
+
+def _pdfplumber_pages(file_bytes: PdfBytes, select: PageSelector) -> Tuple[int, List[Tuple[int, str]]]:
+    pages = []
+    with get_engine("pdfplumber").open(BytesIO(file_bytes)) as pdf:
+        count = len(pdf.pages)
+        for number in select(count):
+            page = pdf.pages[number]
+            pages.append((number, page.extract_text() or ""))
+            # Drops the parsed character objects cached on the page
+            page.close()
+    return count, pages
+
+
+_EXTRACTORS: Dict[str, Extractor] = {
+    "pdfium": _pdfium_pages,
+    "pdfplumber": _pdfplumber_pages,
+}
+
+
+def register_extractor(name: str, extractor: Extractor) -> None:
+    """Make a text-layer engine selectable by OCR_PDF_TEXT_ENGINE."""
+    _EXTRACTORS[name] = extractor
+
+
+def text_engine(doc_type: str) -> str:
+    name = _ENGINE_BY_TYPE.get(doc_type, settings.OCR_PDF_TEXT_ENGINE)
+    return name if name in _EXTRACTORS else "pdfplumber"
+
+
+def page_selection(doc_type: str, count: int) -> List[int]:
+    """0-based pages read for ``doc_type`` out of ``count``, in document order."""
+    head, tail = _PAGES_BY_TYPE.get(doc_type, (settings.OCR_PDF_TEXT_MAX_PAGES, 0))
+    if head + tail >= count:
+        return list(range(count))
+    return list(range(head)) + list(range(count - tail, count))
+
+
+def config_key(doc_type: str) -> str:
+    """Settings that change the extracted text, for cache keys."""
+    head, tail = _PAGES_BY_TYPE.get(doc_type, (settings.OCR_PDF_TEXT_MAX_PAGES, 0))
+    return (f"{text_engine(doc_type)}:{head}+{tail}:{settings.OCR_PDF_TEXT_MAX_TOKENS}"
+            f":{settings.OCR_PDF_TEXT_MIN_CHARS}")
+
+
+def _budget(lengths: List[int], max_chars: int) -> int:
+    """Largest per-page cap that keeps the total within ``max_chars``."""
+    if sum(lengths) <= max_chars:
+        return max(lengths, default=0)
+    remaining, pages = max_chars, len(lengths)
+    # Short pages keep all their text; the rest share what is left equally
+    for length in sorted(lengths):
+        if length * pages > remaining:
+            return remaining // pages
+        remaining -= length
+        pages -= 1
+    return max(lengths)
+
+
+def _join(pages: List[Tuple[int, str]], count: int, max_chars: int) -> str:
+    cap = _budget([len(text) for _, text in pages], max(0, max_chars - _MARKER_CHARS * len(pages)))
+    parts = []
+    previous = -1
+    for number, text in pages:
+        if number > previous + 1:
+            parts.append(f"[... pages {previous + 2}-{number} omitted ...]")
+        previous = number
+        if not text:
+            continue
+        if len(text) > cap:
+            text = text[:cap] + f"\n[... page {number + 1} truncated ...]"
+        parts.append(text)
+    if previous < count - 1:
+        parts.append(f"[... pages {previous + 2}-{count} omitted ...]")
+    return "\n".join(parts) + "\n"
+
+
+def extract_text(file_bytes: PdfBytes, doc_type: str) -> PdfText:
+    """
+    Text layer of the pages ``doc_type`` needs, within the token budget.
+
+    A page whose text layer is shorter than OCR_PDF_TEXT_MIN_CHARS (blank,
+    or a scanner's stamp) counts as scanned and is left out of ``text``,
+    which is empty when every selected page is scanned.
+    """
+    engine = text_engine(doc_type)
+    select = lambda count: page_selection(doc_type, count)
+    try:
+        count, pages = _EXTRACTORS[engine](file_bytes, select)
+    except ImportError as e:
+        if engine == "pdfplumber":
+            raise
+        if engine not in _unavailable:
+            _unavailable.add(engine)
+            print(f"PDF text engine {engine} unavailable ({e}), using pdfplumber")
+        engine = "pdfplumber"
+        count, pages = _pdfplumber_pages(file_bytes, select)
+
+    pages = [(number, text.strip()) for number, text in pages]
+    pages = [(number, text if len(text) >= settings.OCR_PDF_TEXT_MIN_CHARS else "") for number, text in pages]
+    text_pages = [number + 1 for number, text in pages if text]
+    scanned_pages = [number + 1 for number, text in pages if not text]
+    if not text_pages:
+        return PdfText("", count, engine, text_pages, scanned_pages)
+    text = _join(pages, count, settings.OCR_PDF_TEXT_MAX_TOKENS * _CHARS_PER_TOKEN)
+    print(f"[DEBUG] PDF text via {engine}: {len(text_pages)} text + {len(scanned_pages)} scanned of {count} pages, {len(text)} chars")
+    return PdfText(text, count, engine, text_pages, scanned_pages)
@@ -0,0 +1,160 @@
+import contextvars
+import cProfile
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+# ----------------------------
+# Per-request profiling
+# ----------------------------
+# A Timeline collects spans (stages, pages, LLM attempts) for one request. It
+# lives in a context variable, so it follows the request into run_in_threadpool,
+# the job executor and the page pool, and span() costs nothing when no timeline
+# is active. Sampled timelines also cProfile the extraction threads and are
+# written to OCR_PROFILE_DIR instead of being returned to the client.
+
+# Bounds the memory one pathological document can pin in its timeline
+_MAX_EVENTS = 2000
+
+
+class Timeline:
+    def __init__(self, sample: bool = False):
+        self.id = uuid.uuid4().hex[:12]
+        self.sample = sample
+        self.started = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self.profiles: List[str] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self.events) < _MAX_EVENTS:
+                self.events.append(event)
+            else:
+                self.dropped += 1
+
+    def offset_ms(self, at: float) -> float:
+        return round((at - self.started) * 1000, 3)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["start_ms"])
+            profiles = list(self.profiles)
+        # Spans overlap across threads, so totals can exceed the wall time
+        stages: Dict[str, float] = {}
+        for event in events:
+            stages[event["name"]] = round(stages.get(event["name"], 0.0) + event["ms"], 3)
+        return {
+            "id": self.id,
+            "wall_ms": self.offset_ms(time.perf_counter()),
+            "stages": stages,
+            "events": events,
+            "dropped_events": self.dropped,
+            "profiles": profiles,
+        }
+
+
+_current: contextvars.ContextVar[Optional[Timeline]] = contextvars.ContextVar("ocr_timeline", default=None)
+_thread_state = threading.local()
+
+
+def current() -> Optional[Timeline]:
+    return _current.get()
+
+
+@contextmanager
+def activate(timeline: Timeline) -> Iterator[Timeline]:
+    token = _current.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block into the active timeline. Yields ``attrs`` so the block can
+    add details (status codes, byte counts) before it ends.
+    """
+    timeline = _current.get()
+    if timeline is None:
+        yield attrs
+        return
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        timeline.add({
+            "name": name,
+            "start_ms": timeline.offset_ms(started),
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+            "thread": threading.current_thread().name,
+            **attrs,
+        })
+
+
+def event(name: str, **attrs: Any) -> None:
+    """Record an instant (zero-length) event, e.g. a skipped backend."""
+    timeline = _current.get()
+    if timeline is not None:
+        now = timeline.offset_ms(time.perf_counter())
+        timeline.add({"name": name, "start_ms": now, "ms": 0.0, "thread": threading.current_thread().name, **attrs})
+
+
+@contextmanager
+def profiled(label: str) -> Iterator[None]:
+    """cProfile this thread for the block when the active timeline is sampled."""
+    timeline = _current.get()
+    if (timeline is None or not timeline.sample or not settings.OCR_PROFILE_DIR
+            or getattr(_thread_state, "profiling", False)):
+        yield
+        return
+    profiler = cProfile.Profile()
+    _thread_state.profiling = True
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _thread_state.profiling = False
+        path = Path(settings.OCR_PROFILE_DIR) / f"{timeline.id}-{label}-{threading.get_ident()}.prof"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(path))
+            with timeline._lock:
+                timeline.profiles.append(path.name)
+        except OSError as e:
+            print(f"Profile dump failed: {e}")
+
+
+def should_sample() -> bool:
+    rate = settings.OCR_PROFILE_SAMPLE_RATE
+    return bool(settings.OCR_PROFILE_DIR) and rate > 0 and random.random() < rate
+
+
+def write_timeline(timeline: Timeline, path: str) -> None:
+    target = Path(settings.OCR_PROFILE_DIR) / f"{timeline.id}-timeline.json"
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps({"path": path, **timeline.summary()}))
+    except OSError as e:
+        print(f"Timeline dump failed: {e}")
+
+
+def server_timing(summary: Dict[str, Any]) -> str:
+    """Stage totals as a Server-Timing header value."""
+    parts = [f"{name};dur={ms}" for name, ms in summary["stages"].items()]
+    parts.append(f"total;dur={summary['wall_ms']}")
+    return ", ".join(parts)
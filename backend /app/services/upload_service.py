@@ -0,0 +1,125 @@
+import hashlib
+import json
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Tuple, Union
+
+import aiofiles
+from fastapi import UploadFile
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def save_upload(file: UploadFile, dest: Path, max_bytes: int) -> Tuple[int, str]:
+    """
+    Copy a parsed upload to ``dest`` in chunks with async file I/O.
+
+    Starlette has already spooled the multipart body by now; UploadSizeLimit
+    caps that body as it arrives. This re-checks the file itself and computes
+    the SHA-256 in the same pass. Returns (size, hex digest); a partial file
+    is removed when the limit is exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(dest, "wb") as out:
+            while chunk := await file.read(_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds the {max_bytes / (1024 * 1024):.0f}MB upload limit")
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware capping POST bodies on upload paths before they are parsed.
+
+    A Content-Length over the limit is answered with 413 straight away.
+    Chunked bodies are counted as they are received; past the limit the
+    client gets 413 and the app sees a disconnect, so the multipart parser
+    stops spooling instead of reading the rest of the upload. With
+    ``content_types`` only bodies of those types are capped, for endpoints
+    that bound their other body types while reading them.
+    """
+
+    def __init__(self, app: Callable, max_bytes: int, paths: Tuple[str, ...], content_types: Tuple[str, ...] = ()):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+        self.content_types = content_types
+
+    async def _reject(self, send: Callable) -> None:
+        body = json.dumps({"success": False, "error": "File exceeds the upload size limit"}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+        if self.content_types and not content_type.startswith(self.content_types):
+            await self.app(scope, receive, send)
+            return
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        rejected = False
+        responded = False
+
+        async def limited_receive() -> Dict[str, Any]:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not responded:
+                        await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Dict[str, Any]) -> None:
+            nonlocal responded
+            if rejected:
+                return
+            responded = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The app failing on the disconnect we injected is expected
+            if not rejected:
+                raise
+
+
+@contextmanager
+def mapped_file(path: Union[str, Path]) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Read-only memory map of a saved upload, so extraction needs no bytes copy."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap can't map empty files
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
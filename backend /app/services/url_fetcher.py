@@ -0,0 +1,403 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, NamedTuple, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+# ----------------------------
+# URL document fetcher
+# ----------------------------
+# Documents given as URLs are downloaded through shared keep-alive clients
+# (the async one for request handlers, the sync one for executor threads),
+# at most OCR_FETCH_MAX_PER_HOST at a time per host. Bodies are streamed and
+# cut off at OCR_FETCH_MAX_BYTES, and the type is sniffed from the bytes so a
+# presigned URL without an extension, or an HTML error page, is handled
+# before extraction. With OCR_FETCH_CACHE_DIR set, responses carrying an
+# ETag or Last-Modified are kept on disk and revalidated with a conditional
+# GET, so a repeat fetch costs a 304 (or nothing while Cache-Control max-age
+# holds).
+
+
+class FetchError(Exception):
+    pass
+
+
+class DocumentTooLarge(FetchError):
+    pass
+
+
+class FetchedDocument(NamedTuple):
+    content: bytes
+    filename: str
+    content_type: str
+    cached: bool
+
+
+_SIGNATURES = (
+    (b"%PDF", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+)
+
+_EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/tiff": ".tif",
+    "image/bmp": ".bmp",
+    "image/webp": ".webp",
+}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _sniff(content: bytes, header_type: str) -> str:
+    for signature, content_type in _SIGNATURES:
+        if content.startswith(signature):
+            return content_type
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    # Bytes we can't place: trust the header only if it names a document type
+    declared = header_type.split(";")[0].strip().lower()
+    if declared in _EXTENSIONS:
+        return declared
+    raise FetchError(f"Unsupported document content type: {declared or 'unknown'}")
+
+
+def _filename(url: str, content_type: str) -> str:
+    """URL basename with the extension of the sniffed type, which extraction dispatches on."""
+    name = unquote(urlsplit(url).path.rsplit("/", 1)[-1]) or "document"
+    stem = name.rsplit(".", 1)[0] if "." in name else name
+    return (stem or "document") + _EXTENSIONS[content_type]
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _check_length(resp: httpx.Response, max_bytes: int) -> None:
+    length = resp.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise DocumentTooLarge(f"Document exceeds the {max_bytes / (1024 * 1024):.0f}MB download limit")
+
+
+def _check_status(resp: httpx.Response) -> None:
+    # Not raise_for_status(): its message would echo presigned URLs into results
+    if resp.status_code >= 400:
+        raise FetchError(f"Document download failed with HTTP {resp.status_code}")
+
+
+# ----------------------------
+# Disk cache
+# ----------------------------
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class FetchCache:
+    """
+    Downloaded bodies keyed by URL, stored with their validators.
+
+    Only responses with an ETag or Last-Modified are kept. Least recently
+    used bodies are removed once the directory exceeds ``max_bytes``.
+    """
+
+    def __init__(self, disk_dir: str = "", max_bytes: int = 0):
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "stores": 0}
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.disk_dir / f"{key}.body", self.disk_dir / f"{key}.json"
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Stored metadata for ``url``, or None."""
+        if not self.disk_dir:
+            return None
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        return meta if body_path.exists() and meta.get("url") == url else None
+
+    @staticmethod
+    def is_fresh(meta: Dict[str, Any]) -> bool:
+        return meta.get("expires_at", 0) > time.time()
+
+    @staticmethod
+    def validators(meta: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def read(self, url: str, meta: Dict[str, Any], revalidated: bool) -> Optional[FetchedDocument]:
+        body_path, _ = self._paths(url)
+        try:
+            content = body_path.read_bytes()
+            os.utime(body_path)
+        except OSError:
+            return None
+        with self._lock:
+            self._stats["revalidated" if revalidated else "fresh_hits"] += 1
+        return FetchedDocument(content, meta["filename"], meta["content_type"], True)
+
+    def store(self, url: str, doc: FetchedDocument, headers: httpx.Headers) -> None:
+        with self._lock:
+            self._stats["misses"] += 1
+        etag, last_modified = headers.get("etag"), headers.get("last-modified")
+        if not self.disk_dir or not (etag or last_modified):
+            return
+        cache_control = headers.get("cache-control", "").lower()
+        if "no-store" in cache_control:
+            return
+        max_age = _MAX_AGE.search(cache_control)
+        expires_at = time.time() + int(max_age.group(1)) if max_age and "no-cache" not in cache_control else 0
+        meta = {
+            "url": url, "etag": etag, "last_modified": last_modified, "expires_at": expires_at,
+            "filename": doc.filename, "content_type": doc.content_type, "size": len(doc.content),
+        }
+
+        body_path, meta_path = self._paths(url)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            previous = body_path.stat().st_size if body_path.exists() else 0
+            body_tmp, meta_tmp = body_path.with_name(body_path.name + suffix), meta_path.with_name(meta_path.name + suffix)
+            body_tmp.write_bytes(doc.content)
+            meta_tmp.write_text(json.dumps(meta))
+            os.replace(body_tmp, body_path)
+            os.replace(meta_tmp, meta_path)
+        except OSError as e:
+            print(f"Fetch cache write failed: {e}")
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+            if self._size is not None:
+                self._size += len(doc.content) - previous
+        self._prune()
+
+    def _prune(self) -> None:
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self.disk_dir.glob("*.body"))
+            if self._size <= self.max_bytes:
+                return
+            bodies = sorted(self.disk_dir.glob("*.body"), key=lambda p: p.stat().st_mtime)
+            for body in bodies:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    size = body.stat().st_size
+                    body.unlink()
+                    body.with_suffix(".json").unlink(missing_ok=True)
+                    self._size -= size
+                except OSError:
+                    continue
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "enabled": self.disk_dir is not None}
+
+
+fetch_cache = FetchCache(
+    disk_dir=settings.OCR_FETCH_CACHE_DIR,
+    max_bytes=settings.OCR_FETCH_CACHE_MAX_MB * 1024 * 1024,
+)
+
+
+def fetch_stats() -> Dict[str, Any]:
+    return fetch_cache.stats()
+
+
+# ----------------------------
+# Clients
+# ----------------------------
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_slots: Dict[str, threading.BoundedSemaphore] = {}
+_async_slots: Dict[str, asyncio.Semaphore] = {}
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_keepalive_connections=settings.OCR_FETCH_MAX_PER_HOST * 4)
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.OCR_FETCH_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+
+
+def _get_sync_client() -> httpx.Client:
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(limits=_limits(), timeout=_timeout(), follow_redirects=True)
+        return _sync_client
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(limits=_limits(), timeout=_timeout(), follow_redirects=True)
+    return _async_client
+
+
+@contextmanager
+def _sync_slot(url: str) -> Iterator[None]:
+    with _lock:
+        slot = _sync_slots.setdefault(_host(url), threading.BoundedSemaphore(settings.OCR_FETCH_MAX_PER_HOST))
+    with slot:
+        yield
+
+
+@asynccontextmanager
+async def _async_slot(url: str) -> AsyncIterator[None]:
+    slot = _async_slots.setdefault(_host(url), asyncio.Semaphore(settings.OCR_FETCH_MAX_PER_HOST))
+    async with slot:
+        yield
+
+
+async def close_fetch_clients() -> None:
+    global _sync_client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    _async_slots.clear()
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+# ----------------------------
+# Fetching
+# ----------------------------
+def _document(url: str, content: bytes, resp: httpx.Response) -> FetchedDocument:
+    content_type = _sniff(content, resp.headers.get("content-type", ""))
+    return FetchedDocument(content, _filename(url, content_type), content_type, False)
+
+
+def fetch_document_sync(url: str, max_bytes: Optional[int] = None, use_cache: bool = True) -> FetchedDocument:
+    """Download a URL document from an executor thread; see fetch_document."""
+    max_bytes = max_bytes or settings.OCR_FETCH_MAX_BYTES
+    meta = fetch_cache.lookup(url) if use_cache else None
+    if meta and fetch_cache.is_fresh(meta):
+        doc = fetch_cache.read(url, meta, revalidated=False)
+        if doc:
+            return doc
+
+    stale = False
+    try:
+        with _sync_slot(url), _get_sync_client().stream(
+            "GET", url, headers=fetch_cache.validators(meta) if meta else None
+        ) as resp:
+            if resp.status_code == 304 and meta:
+                doc = fetch_cache.read(url, meta, revalidated=True)
+                if doc:
+                    return doc
+                stale = True
+            else:
+                _check_status(resp)
+                _check_length(resp, max_bytes)
+                body = bytearray()
+                for chunk in resp.iter_bytes(_CHUNK_SIZE):
+                    body += chunk
+                    if len(body) > max_bytes:
+                        raise DocumentTooLarge(f"Document exceeds the {max_bytes / (1024 * 1024):.0f}MB download limit")
+    except httpx.HTTPError as e:
+        raise FetchError(f"Document download failed: {type(e).__name__}") from e
+
+    if stale:
+        # Body vanished under us; fetch it again without validators, after
+        # giving back the host slot and connection held by the 304
+        return fetch_document_sync(url, max_bytes, use_cache=False)
+    doc = _document(url, bytes(body), resp)
+    fetch_cache.store(url, doc, resp.headers)
+    return doc
+
+
+async def fetch_document(url: str, max_bytes: Optional[int] = None, use_cache: bool = True) -> FetchedDocument:
+    """
+    Download a URL document without blocking the event loop.
+
+    Raises DocumentTooLarge past ``max_bytes`` (OCR_FETCH_MAX_BYTES) and
+    FetchError for HTTP errors, transport failures and content that is neither
+    a PDF nor an image.
+    """
+    max_bytes = max_bytes or settings.OCR_FETCH_MAX_BYTES
+    meta = await asyncio.to_thread(fetch_cache.lookup, url) if use_cache else None
+    if meta and fetch_cache.is_fresh(meta):
+        doc = await asyncio.to_thread(fetch_cache.read, url, meta, False)
+        if doc:
+            return doc
+
+    stale = False
+    try:
+        async with _async_slot(url), _get_async_client().stream(
+            "GET", url, headers=fetch_cache.validators(meta) if meta else None
+        ) as resp:
+            if resp.status_code == 304 and meta:
+                doc = await asyncio.to_thread(fetch_cache.read, url, meta, True)
+                if doc:
+                    return doc
+                stale = True
+            else:
+                _check_status(resp)
+                _check_length(resp, max_bytes)
+                body = bytearray()
+                async for chunk in resp.aiter_bytes(_CHUNK_SIZE):
+                    body += chunk
+                    if len(body) > max_bytes:
+                        raise DocumentTooLarge(f"Document exceeds the {max_bytes / (1024 * 1024):.0f}MB download limit")
+    except httpx.HTTPError as e:
+        raise FetchError(f"Document download failed: {type(e).__name__}") from e
+
+    if stale:
+        # As in fetch_document_sync: retry outside the slot and response
+        return await fetch_document(url, max_bytes, use_cache=False)
+    doc = _document(url, bytes(body), resp)
+    await asyncio.to_thread(fetch_cache.store, url, doc, resp.headers)
+    return doc
+
+
+class FetchSession:
+    """
+    URL fetches for one request: a URL listed several times is downloaded
+    once and every caller gets the same document.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, "asyncio.Future[FetchedDocument]"] = {}
+
+    async def fetch(self, url: str) -> FetchedDocument:
+        task = self._tasks.get(url)
+        if task is None:
+            task = asyncio.ensure_future(fetch_document(url))
+            self._tasks[url] = task
+        # One caller giving up must not cancel the download for the others
+        return await asyncio.shield(task)
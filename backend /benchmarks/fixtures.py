@@ -0,0 +1,105 @@
+"""
+Synthetic documents for benchmarks: ID card images and text/scanned PDFs.
+
+Everything is generated in memory from fixed seeds, so runs are comparable
+without shipping binary fixtures.
+"""
+import random
+import zlib
+from io import BytesIO
+from typing import List
+
+from PIL import Image, ImageDraw, ImageFilter
+
+_CARD_SIZE = (1012, 638)
+
+_CARD_LINES = {
+    "pan": [
+        "INCOME TAX DEPARTMENT", "GOVT. OF INDIA", "Permanent Account Number Card",
+        "ABCPS1234K", "Name", "RAHUL KUMAR SHARMA", "Father's Name", "SURESH KUMAR SHARMA",
+        "Date of Birth", "14/08/1990",
+    ],
+    "aadhaar": [
+        "GOVERNMENT OF INDIA", "PRIYA NAIR", "DOB: 02/01/1985", "FEMALE",
+        "2345 6789 0123", "Unique Identification Authority of India",
+    ],
+}
+
+
+def card_image(kind: str, seed: int = 0) -> bytes:
+    """A photographed-looking ID card: text on a noisy, slightly blurred background."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", _CARD_SIZE, (236, 232, 220))
+    draw = ImageDraw.Draw(image)
+    # Texture so the JPEG costs about as much as a real photo
+    for _ in range(4000):
+        x, y = rng.randrange(_CARD_SIZE[0]), rng.randrange(_CARD_SIZE[1])
+        shade = rng.randrange(190, 250)
+        draw.point((x, y), fill=(shade, shade - 4, shade - 12))
+    draw.rectangle((40, 60, 240, 300), outline=(90, 90, 90), width=3)
+    for i, line in enumerate(_CARD_LINES[kind]):
+        draw.text((280, 60 + i * 48), line, fill=(20, 20, 20))
+    image = image.filter(ImageFilter.GaussianBlur(0.6))
+    out = BytesIO()
+    image.save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+def large_scan(megabytes: float, seed: int = 0) -> bytes:
+    """An incompressible PNG of about ``megabytes``, standing in for a high-resolution scan."""
+    rng = random.Random(seed)
+    side = int((megabytes * 1024 * 1024 / 3) ** 0.5)
+    image = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    out = BytesIO()
+    image.save(out, format="PNG", compress_level=1)
+    return out.getvalue()
+
+
+def scanned_pdf(pages: int, seed: int = 0) -> bytes:
+    """An image-only PDF, one card scan per page."""
+    images: List[Image.Image] = []
+    for page in range(pages):
+        images.append(Image.open(BytesIO(card_image("pan", seed + page))).convert("RGB"))
+    out = BytesIO()
+    images[0].save(out, format="PDF", save_all=True, append_images=images[1:], resolution=150)
+    return out.getvalue()
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """A searchable PDF with a Helvetica text layer on every page."""
+    objects: List[bytes] = []
+    page_ids = [3 + 2 * i for i in range(pages)]
+    font_id = 3 + 2 * pages
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    for page in range(pages):
+        lines = [f"INCOME TAX DEPARTMENT - statement page {page + 1}", "Name: RAHUL KUMAR SHARMA",
+                 "PAN: ABCPS1234K", "Date of Birth: 14/08/1990"]
+        lines += [f"Line {n}: assessment year 2023-24 amount {1000 + n * 37}.00" for n in range(lines_per_page - len(lines))]
+        stream = "BT /F1 10 Tf 50 800 Td 14 TL " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        data = zlib.compress(stream.encode())
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {page_ids[page] + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode() + data + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
@@ -0,0 +1,393 @@
+"""
+Offline benchmark: the API against a local stub LLM, no external services.
+
+Starts benchmarks.stub_llm and the FastAPI app (SQLite, Ollama backend
+pointed at the stub) as subprocesses, drives the upload and extract endpoints
+with synthetic documents at each concurrency level, and writes throughput,
+latency percentiles, peak RSS and RSS growth per in-flight request to a JSON
+file.
+
+    python -m benchmarks.run --concurrency 1,4,16 --requests 40
+    python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+    python -m benchmarks.run --fresh-process --concurrency 1 --scenarios extract_scan_base64,extract_scan_binary
+
+Run from the backend directory. PDF scenarios need poppler, like the app.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks import fixtures
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+
+# ----------------------------
+# Scenarios
+# ----------------------------
+Result = Tuple[str, Optional[float]]
+
+
+def _outcome(resp: httpx.Response) -> str:
+    # Extraction failures still answer 200: upload endpoints set success to
+    # false, /extract ones put an error under results (or in a result item)
+    if resp.status_code == 200:
+        body = resp.json()
+        results = body.get("results")
+        items = results if isinstance(results, list) else [results]
+        if body.get("success") is False or any(isinstance(item, dict) and "error" in item for item in items):
+            return "200-error"
+    return str(resp.status_code)
+
+
+def _upload(path: str, filename: str, content: bytes, mime: str) -> Callable[[httpx.AsyncClient], Awaitable[Result]]:
+    async def send(client: httpx.AsyncClient) -> Result:
+        resp = await client.post(path, files={"file": (filename, content, mime)})
+        return _outcome(resp), None
+    return send
+
+
+def _extract(path: str, content: bytes, mime: str) -> Callable[[httpx.AsyncClient], Awaitable[Result]]:
+    document = f"data:{mime};base64,{base64.b64encode(content).decode()}"
+
+    async def send(client: httpx.AsyncClient) -> Result:
+        resp = await client.post(path, json={"documents": [document]})
+        return _outcome(resp), None
+    return send
+
+
+def _multipart(path: str, filename: str, content: bytes, mime: str) -> Callable[[httpx.AsyncClient], Awaitable[Result]]:
+    async def send(client: httpx.AsyncClient) -> Result:
+        resp = await client.post(path, files={"files": (filename, content, mime)})
+        return _outcome(resp), None
+    return send
+
+
+def _binary(path: str, content: bytes, mime: str) -> Callable[[httpx.AsyncClient], Awaitable[Result]]:
+    async def send(client: httpx.AsyncClient) -> Result:
+        resp = await client.post(path, content=content, headers={"Content-Type": mime})
+        return _outcome(resp), None
+    return send
+
+
+def _stream(path: str, filename: str, content: bytes, mime: str) -> Callable[[httpx.AsyncClient], Awaitable[Result]]:
+    """SSE upload; also reports the time to the first field event."""
+    async def send(client: httpx.AsyncClient) -> Result:
+        started = time.perf_counter()
+        first_field = None
+        outcome = "stream-incomplete"
+        async with client.stream("POST", path, files={"file": (filename, content, mime)}) as resp:
+            if resp.status_code != 200:
+                return str(resp.status_code), None
+            async for line in resp.aiter_lines():
+                if line == "event: field" and first_field is None:
+                    first_field = (time.perf_counter() - started) * 1000
+                elif line == "event: done":
+                    outcome = "200"
+                elif line == "event: error":
+                    outcome = "200-error"
+        return outcome, first_field
+    return send
+
+
+def build_scenarios(pdf_pages: int, scan_mb: float) -> Dict[str, Callable[[httpx.AsyncClient], Awaitable[Result]]]:
+    pan = fixtures.card_image("pan")
+    aadhaar = fixtures.card_image("aadhaar", seed=1)
+    scan = fixtures.large_scan(scan_mb)
+    return {
+        "upload_pan_image": _upload("/api/v1/ocr/upload/pan", "pan.jpg", pan, "image/jpeg"),
+        "upload_aadhaar_image": _upload("/api/v1/ocr/upload/ind_aadhaar", "aadhaar.jpg", aadhaar, "image/jpeg"),
+        "extract_pan_base64": _extract("/api/v1/ocr/extract/pan", pan, "image/jpeg"),
+        "extract_pan_multipart": _multipart("/api/v1/ocr/extract/pan", "pan.jpg", pan, "image/jpeg"),
+        "extract_pan_binary": _binary("/api/v1/ocr/extract/pan", pan, "application/octet-stream"),
+        # Large bodies make the ingestion cost (copies per request) visible in RSS
+        "extract_scan_base64": _extract("/api/v1/ocr/extract/pan", scan, "image/png"),
+        "extract_scan_multipart": _multipart("/api/v1/ocr/extract/pan", "scan.png", scan, "image/png"),
+        "extract_scan_binary": _binary("/api/v1/ocr/extract/pan", scan, "application/octet-stream"),
+        "upload_text_pdf": _upload("/api/v1/ocr/upload/pan", "statement.pdf", fixtures.text_pdf(pdf_pages), "application/pdf"),
+        "upload_scanned_pdf": _upload("/api/v1/ocr/upload/pan", "scan.pdf", fixtures.scanned_pdf(pdf_pages), "application/pdf"),
+        "stream_pan_image": _stream("/api/v1/ocr/stream/pan", "pan.jpg", pan, "image/jpeg"),
+    }
+
+
+# ----------------------------
+# Processes
+# ----------------------------
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(module: str, port: int, env: Dict[str, str], cwd: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "PYTHONPATH": str(BACKEND_DIR), **env},
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+class RssSampler:
+    """Polls a process's resident set size from /proc (Linux only)."""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self.baseline_kb = 0
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _rss_kb(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            return None
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rss = self._rss_kb()
+            if rss:
+                self.peak_kb = max(self.peak_kb, rss)
+            time.sleep(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.baseline_kb = self._rss_kb() or 0
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return round(self.peak_kb / 1024, 1) if self.peak_kb else None
+
+    def per_request_mb(self, in_flight: int) -> Optional[float]:
+        """Peak growth over the idle process, shared out over the requests in flight."""
+        if not self.peak_kb or not self.baseline_kb:
+            return None
+        return round(max(0, self.peak_kb - self.baseline_kb) / 1024 / in_flight, 1)
+
+
+# ----------------------------
+# Load generation
+# ----------------------------
+def _percentile(ordered: List[float], pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+
+async def _drive(base_url: str, send: Callable[[httpx.AsyncClient], Awaitable[Result]], requests: int, concurrency: int, timeout: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    first_fields: List[float] = []
+    statuses: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def one() -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    key, first_field = await send(client)
+                except httpx.HTTPError as e:
+                    key, first_field = type(e).__name__, None
+                elapsed = (time.perf_counter() - started) * 1000
+                statuses[key] = statuses.get(key, 0) + 1
+                if key == "200":
+                    latencies.append(elapsed)
+                    if first_field is not None:
+                        first_fields.append(first_field)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        wall = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    row = {
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": requests - len(latencies),
+        "status_counts": statuses,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else None,
+        "latency_ms": _summary(ordered),
+    }
+    if first_fields:
+        row["first_field_ms"] = _summary(sorted(first_fields))
+    return row
+
+
+def _summary(ordered: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": _percentile(ordered, 50),
+        "p95": _percentile(ordered, 95),
+        "p99": _percentile(ordered, 99),
+        "mean": round(sum(ordered) / len(ordered), 2) if ordered else None,
+        "max": round(ordered[-1], 2) if ordered else None,
+    }
+
+
+# ----------------------------
+# Reporting
+# ----------------------------
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_row(row: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+    latency = row["latency_ms"]
+    line = (f"{row['scenario']:<22} c={row['concurrency']:<3} ok={row['ok']:<4} err={row['errors']:<3} "
+            f"rps={row['throughput_rps']!s:<8} p50={latency['p50']!s:<9} p95={latency['p95']!s:<9} "
+            f"p99={latency['p99']!s:<9} rss={row['peak_rss_mb']}MB per-req={row['rss_per_request_mb']}MB")
+    if "first_field_ms" in row:
+        line += f" first-field p50={row['first_field_ms']['p50']}"
+    if previous and previous["latency_ms"]["p95"] and latency["p95"] and previous["throughput_rps"]:
+        p95_delta = (latency["p95"] / previous["latency_ms"]["p95"] - 1) * 100
+        rps_delta = ((row["throughput_rps"] or 0) / previous["throughput_rps"] - 1) * 100
+        line += f"  | vs baseline p95 {p95_delta:+.1f}% rps {rps_delta:+.1f}%"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="all", help="comma list of scenario names, or 'all'")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma list of concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario and level")
+    parser.add_argument("--pdf-pages", type=int, default=3)
+    parser.add_argument("--scan-mb", type=float, default=8, help="size of the large-scan fixture")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--stub-latency-ms", type=float, default=300)
+    parser.add_argument("--stub-jitter-ms", type=float, default=100)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--fresh-process", action="store_true",
+                        help="restart the API per scenario so RSS growth isn't masked by earlier scenarios")
+    parser.add_argument("--cache", action="store_true", help="leave the extraction cache on (off by default)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app settings")
+    parser.add_argument("--output", help="result file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(args.pdf_pages, args.scan_mb)
+    names = list(scenarios) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (have {', '.join(scenarios)})")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    stub_env = {
+        "STUB_LATENCY_MS": str(args.stub_latency_ms),
+        "STUB_JITTER_MS": str(args.stub_jitter_ms),
+        "STUB_ERROR_RATE": str(args.stub_error_rate),
+        "STUB_THROTTLE_RATE": str(args.stub_throttle_rate),
+    }
+    workdir = tempfile.mkdtemp(prefix="ocr-bench-")
+    stub_port, app_port = _free_port(), _free_port()
+    app_env = {
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "OCR_LLM_BACKEND": "ollama",
+        "GITHUB_INFERENCE_API_KEY": "",
+        "DB_SQLITE_PATH": os.path.join(workdir, "bench.db"),
+        "OCR_CACHE_ENABLED": "true" if args.cache else "false",
+        **dict(item.split("=", 1) for item in args.env),
+    }
+
+    previous_rows: Dict[tuple, Dict[str, Any]] = {}
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        previous_rows = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+
+    stub = _start("benchmarks.stub_llm:app", stub_port, stub_env, workdir)
+    api: Optional[subprocess.Popen] = None
+    base_url = f"http://127.0.0.1:{app_port}"
+    results: List[Dict[str, Any]] = []
+    try:
+        _wait_ready(f"http://127.0.0.1:{stub_port}/stats", stub)
+        for name in names:
+            if api is None or args.fresh_process:
+                if api is not None:
+                    _stop(api)
+                api = _start("app.main:app", app_port, app_env, workdir)
+                _wait_ready(f"{base_url}/ready", api)
+            # One untimed request so lazy engine loads don't land in the numbers.
+            # A fresh process is warmed with a small image instead, so the
+            # scenario's own first request still shows in its RSS growth.
+            warmup = scenarios["extract_pan_binary"] if args.fresh_process else scenarios[name]
+            asyncio.run(_drive(base_url, warmup, 1, 1, args.timeout))
+            for level in levels:
+                with RssSampler(api.pid) as rss:
+                    row = asyncio.run(_drive(base_url, scenarios[name], args.requests, level, args.timeout))
+                row = {"scenario": name, "concurrency": level, **row, "peak_rss_mb": rss.peak_mb,
+                       "rss_per_request_mb": rss.per_request_mb(min(level, args.requests))}
+                results.append(row)
+                _print_row(row, previous_rows.get((name, level)))
+        stub_stats = httpx.get(f"http://127.0.0.1:{stub_port}/stats").json()
+    finally:
+        for proc in (api, stub):
+            if proc is not None:
+                _stop(proc)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "config": {**vars(args), "app_env": app_env, "stub_env": stub_env},
+        "stub_stats": stub_stats,
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
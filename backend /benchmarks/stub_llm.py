@@ -0,0 +1,117 @@
+"""
+Stub OpenAI-compatible chat completions server for offline benchmarks.
+
+Answers POST /v1/chat/completions with a canned JSON document matching the
+prompt's document type, after an injected delay. Behaviour is configured
+through environment variables:
+
+    STUB_LATENCY_MS      mean response delay (default 300)
+    STUB_JITTER_MS       +/- uniform jitter on the delay (default 100)
+    STUB_ERROR_RATE      fraction of requests answered with a 500 (default 0)
+    STUB_THROTTLE_RATE   fraction answered with a 429 + Retry-After (default 0)
+    STUB_TTFT_FRACTION   with "stream": true, share of the delay before the
+                         first token; the rest is spread over the chunks (0.2)
+
+Run with: uvicorn benchmarks.stub_llm:app --port 8100
+"""
+import asyncio
+import json
+import os
+import random
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "300"))
+JITTER_MS = float(os.getenv("STUB_JITTER_MS", "100"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+THROTTLE_RATE = float(os.getenv("STUB_THROTTLE_RATE", "0"))
+TTFT_FRACTION = float(os.getenv("STUB_TTFT_FRACTION", "0.2"))
+_CHUNK_CHARS = 8
+
+_ANSWERS = {
+    "PAN card": {
+        "name": "RAHUL KUMAR SHARMA", "age": 34, "date_of_birth": "14/08/1990",
+        "date_of_issue": "", "fathers_name": "SURESH KUMAR SHARMA", "pan_no": "ABCPS1234K",
+        "aa": "", "type": "ind_pan",
+    },
+    "Aadhaar card": {
+        "full_address": "12 MG ROAD, BENGALURU", "date_of_birth": "02/01/1985", "district": "BENGALURU",
+        "fathers_name": "", "mobile": "", "gender": "Female", "house_no": "12",
+        "aadhar_no": "2345 6789 0123", "name": "PRIYA NAIR", "pincode": "560001",
+        "state": "KARNATAKA", "address_line": "MG ROAD", "type": "ind_aadhar",
+    },
+    "Voter ID card": {
+        "full_address": "", "age": "40", "date_of_birth": "", "district": "PUNE",
+        "fathers_name": "VIJAY DESAI", "gender": "Male", "house_number": "", "voter_id": "ABC1234567",
+        "name": "AMIT DESAI", "pincode": "411001", "state": "MAHARASHTRA", "address_line": "",
+        "year_of_birth": "1984", "type": "ind_voterid",
+    },
+}
+
+app = FastAPI(title="Stub LLM")
+_stats = {"requests": 0, "errors": 0, "throttled": 0, "images": 0}
+
+
+def _prompt_text(payload: Dict[str, Any]) -> str:
+    texts = []
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "image_url":
+                _stats["images"] += 1
+            else:
+                texts.append(part.get("text", ""))
+    return "\n".join(texts)
+
+
+def _answer(prompt: str) -> str:
+    for marker, answer in _ANSWERS.items():
+        if marker in prompt:
+            return json.dumps(answer)
+    return "{}"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    _stats["requests"] += 1
+    prompt = _prompt_text(payload)
+
+    delay = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000
+    streaming = bool(payload.get("stream"))
+    await asyncio.sleep(delay * TTFT_FRACTION if streaming else delay)
+
+    roll = random.random()
+    if roll < THROTTLE_RATE:
+        _stats["throttled"] += 1
+        return JSONResponse(status_code=429, content={"error": "rate limited"}, headers={"Retry-After": "1"})
+    if roll < THROTTLE_RATE + ERROR_RATE:
+        _stats["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": "injected failure"})
+
+    if streaming:
+        return StreamingResponse(_stream(_answer(prompt), delay * (1 - TTFT_FRACTION)), media_type="text/event-stream")
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "model": payload.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": _answer(prompt)}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 100, "total_tokens": len(prompt) // 4 + 100},
+    }
+
+
+async def _stream(answer: str, duration: float):
+    chunks = [answer[i:i + _CHUNK_CHARS] for i in range(0, len(answer), _CHUNK_CHARS)]
+    for chunk in chunks:
+        delta = {"choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+        yield f"data: {json.dumps(delta)}\n\n"
+        await asyncio.sleep(duration / len(chunks))
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/stats")
+async def stats():
+    return _stats
@@ -0,0 +1,124 @@
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import llm_routing
+from app.services.llm_limiter import LLMRateLimited, send_limited
+from app.services.llm_routing import CircuitBreaker, call_backend, get_breaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_routing.time, "monotonic", clock)
+    return clock
+
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", failure_threshold=3, slow_seconds=5.0, cooldown_seconds=30.0)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = _breaker()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_success_resets_the_count(clock):
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_answers_count_as_failures(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_success(6.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.snapshot()["slow"] == 3
+
+
+def test_half_open_admits_one_probe(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.snapshot()["opened"] == 2
+    assert not breaker.allow()
+
+
+def test_p95_needs_enough_samples(clock):
+    breaker = _breaker()
+    for i in range(19):
+        breaker.record_success(i / 10)
+    assert breaker.p95() is None
+    breaker.record_success(1.9)
+    assert breaker.p95() == pytest.approx(1.8)
+
+
+def _response(status: int) -> httpx.Response:
+    return httpx.Response(status, text="body", request=httpx.Request("POST", "http://llm/"))
+
+
+def test_call_backend_times_only_the_http_attempt(clock, monkeypatch):
+    monkeypatch.setattr(llm_routing.time, "sleep", lambda seconds: setattr(clock, "now", clock.now + seconds))
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX", 1)
+    answers = iter([_response(503), _response(200)])
+
+    def attempt() -> httpx.Response:
+        clock.now += 0.5
+        return next(answers)
+
+    def send() -> str:
+        clock.now += 60  # queued behind other requests
+        return send_limited("test-timed", {}, attempt).text
+
+    call_backend("test-timed", send)
+    breaker = get_breaker("test-timed")
+    assert breaker.snapshot()["slow"] == 0
+    assert breaker._latencies[-1] == pytest.approx(0.5)
+
+
+def test_throttling_is_not_a_backend_failure(clock, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX", 0)
+    breaker = get_breaker("test-throttled-breaker")
+    for _ in range(breaker.failure_threshold + 1):
+        with pytest.raises(LLMRateLimited):
+            call_backend("test-throttled-breaker", lambda: send_limited("test-throttled-breaker", {}, lambda: _response(429)).text)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["throttled"] == breaker.failure_threshold + 1
+    assert breaker.snapshot()["failures"] == 0
@@ -0,0 +1,140 @@
+import asyncio
+import base64
+import json
+import os
+
+import pytest
+
+from app.services.document_ingest import (
+    Base64Decoder,
+    JSONDocumentsReader,
+    read_binary,
+    read_json_documents,
+    upload_filename,
+)
+from app.services.upload_service import UploadTooLarge
+
+MB = 1024 * 1024
+CHUNK_SIZES = [1, 2, 3, 4, 5, 7, 13, 64, 1000]
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _read(body: bytes, size: int, max_bytes: int = MB, max_total_bytes: int = 4 * MB):
+    reader = JSONDocumentsReader(max_bytes, max_total_bytes)
+    for chunk in _chunks(body, size):
+        reader.feed(chunk)
+    return reader.finish()
+
+
+def _expected(body: bytes):
+    """What json.loads plus base64.b64decode make of the same body."""
+    documents = []
+    for doc in json.loads(body)["documents"]:
+        if doc.startswith(("http://", "https://")):
+            documents.append(doc)
+        else:
+            payload = doc.split(",", 1)[1] if doc.startswith("data:") else doc
+            documents.append(base64.b64decode(payload + "=" * (-len(payload) % 4)))
+    return documents
+
+
+def _encode(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+PAYLOAD = os.urandom(3000)
+BODIES = {
+    "plain": json.dumps({"documents": [_encode(PAYLOAD)]}),
+    "data_uri": json.dumps({"documents": ["data:image/png;base64," + _encode(PAYLOAD)]}),
+    "url_and_base64": json.dumps({"documents": ["https://example.com/a.pdf?x=1&y=2", _encode(PAYLOAD[:100])]}),
+    # Encoders that escape "/" and wrap lines at 76 characters
+    "escaped_slashes": json.dumps({"documents": [_encode(PAYLOAD)]}).replace("/", "\\/"),
+    "wrapped": json.dumps({"documents": [base64.encodebytes(PAYLOAD).decode()]}),
+    "unicode_escapes": json.dumps({"documents": [_encode(PAYLOAD).replace("+", "\\u002b").replace("/", "\\u002F")]}),
+    "no_padding": json.dumps({"documents": [_encode(PAYLOAD[:100]).rstrip("=")]}),
+    "other_keys": json.dumps({
+        "doc_type": "ind_pan",
+        "meta": {"documents": ["ignored"], "note": "brace } and \"quote\" [", "n": [1, 2, {"a": None}]},
+        "documents": [_encode(b"first"), "http://example.com/b.jpg"],
+        "tail": True,
+        "esc\"key": "documents",
+    }),
+    "whitespace": '{\n  "documents" : [\n    "%s" ,\n    "%s"\n  ]\n}\n' % (_encode(b"one"), _encode(b"two")),
+}
+
+
+@pytest.mark.parametrize("name", sorted(BODIES))
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_reader_matches_json_and_base64(name, size):
+    body = BODIES[name].encode()
+    documents = _read(body, size)
+    assert [d if isinstance(d, str) else bytes(d) for d in documents] == _expected(body)
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_base64_decoder_any_split(size):
+    for length in (0, 1, 2, 3, 4, 5, 100, 101, 102):
+        data = os.urandom(length)
+        decoder = Base64Decoder(MB)
+        for chunk in _chunks(base64.b64encode(data), size):
+            decoder.feed(chunk)
+        assert bytes(decoder.finish()) == data
+
+
+def test_base64_decoder_rejects_lone_trailing_character():
+    decoder = Base64Decoder(MB)
+    decoder.feed(b"QUJDR")
+    with pytest.raises(ValueError):
+        decoder.finish()
+
+
+def test_document_over_limit():
+    body = json.dumps({"documents": [_encode(os.urandom(2000))]}).encode()
+    with pytest.raises(UploadTooLarge):
+        _read(body, 64, max_bytes=1000)
+
+
+def test_documents_over_total_limit():
+    body = json.dumps({"documents": [_encode(os.urandom(600)), _encode(os.urandom(600))]}).encode()
+    with pytest.raises(UploadTooLarge):
+        _read(body, 64, max_bytes=1000, max_total_bytes=1000)
+
+
+@pytest.mark.parametrize("body", [
+    b'{"documents": ["QUJD"',
+    b'{"documents": "QUJD"}',
+    b'{"documents": {"a": "QUJD"}}',
+    b'{"documents": [1, 2]}',
+    b'{"documents": [["QUJD"]]}',
+    b'["QUJD"]',
+    b'{"documents": ["QU\\qJD"]}',
+])
+def test_malformed_bodies(body):
+    with pytest.raises(ValueError):
+        _read(body, 3)
+
+
+def test_read_json_documents_requires_documents():
+    async def stream():
+        yield b'{"documents": []}'
+
+    with pytest.raises(ValueError):
+        asyncio.run(read_json_documents(stream(), MB, MB))
+
+
+def test_read_binary_limit():
+    async def stream():
+        for _ in range(3):
+            yield b"x" * 400
+
+    assert len(asyncio.run(read_binary(stream(), 1200))) == 1200
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(read_binary(stream(), 1000))
+
+
+def test_upload_filename():
+    assert upload_filename(b"%PDF-1.7") == "upload.pdf"
+    assert upload_filename(bytearray(b"\xff\xd8\xff")) == "upload.jpg"
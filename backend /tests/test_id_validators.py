@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+
+from app.services.id_validators import age_from_dob, extract_fields, valid_date, valid_pan, verhoeff_valid
+
+
+def _aadhaar(prefix: str = "23456789012") -> str:
+    """A 12-digit number with a valid Verhoeff check digit."""
+    return next(prefix + d for d in "0123456789" if verhoeff_valid(prefix + d))
+
+
+def _lines(*texts: str, confidence: float = 0.99):
+    return [(text, confidence) for text in texts]
+
+
+def test_verhoeff():
+    number = _aadhaar()
+    assert verhoeff_valid(number)
+    wrong = number[:-1] + str((int(number[-1]) + 1) % 10)
+    assert not verhoeff_valid(wrong)
+
+
+@pytest.mark.parametrize("value,doc_type,expected", [
+    ("ABCPS1234K", "ind_pan", True),
+    ("ABCCS1234K", "ind_pan", False),
+    ("ABCCS1234K", "comp_pan", True),
+    ("ABCPS1234", "ind_pan", False),
+    ("ABCXS1234K", "ind_pan", False),
+])
+def test_valid_pan(value, doc_type, expected):
+    assert valid_pan(value, doc_type) is expected
+
+
+def test_valid_date_and_age():
+    assert valid_date("14/08/1990")
+    assert not valid_date("31/02/1990")
+    assert not valid_date("01/01/1899")
+    assert not valid_date(f"01/01/{date.today().year + 1}")
+    today = date.today()
+    assert age_from_dob(today.replace(year=today.year - 30).strftime("%d/%m/%Y")) == 30
+
+
+def test_pan_labelled_layout():
+    lines = _lines(
+        "INCOME TAX DEPARTMENT", "GOVT. OF INDIA", "Permanent Account Number Card", "ABCPS1234K",
+        "Name", "RAHUL KUMAR SHARMA", "Father's Name", "SURESH KUMAR SHARMA", "Date of Birth", "14/08/1990",
+    )
+    assert extract_fields(lines, "ind_pan", 0.9) == {
+        "pan_no": "ABCPS1234K", "name": "RAHUL KUMAR SHARMA",
+        "fathers_name": "SURESH KUMAR SHARMA", "date_of_birth": "14/08/1990",
+    }
+
+
+def test_pan_fixes_ocr_confusions_and_old_layout():
+    lines = _lines("INCOME TAX DEPARTMENT", "RAHUL KUMAR SHARMA", "SURESH KUMAR SHARMA", "14/08/1990", "ABCPS12B4K")
+    fields = extract_fields(lines, "ind_pan", 0.9)
+    assert fields["pan_no"] == "ABCPS1284K"
+    assert fields["name"] == "RAHUL KUMAR SHARMA"
+    assert fields["fathers_name"] == "SURESH KUMAR SHARMA"
+
+
+def test_aadhaar():
+    number = _aadhaar()
+    lines = _lines("Government of India", "PRIYA NAIR", "DOB: 02/01/1985", "FEMALE",
+                   f"{number[:4]} {number[4:8]} {number[8:]}")
+    assert extract_fields(lines, "ind_aadhaar", 0.9) == {
+        "aadhar_no": f"{number[:4]} {number[4:8]} {number[8:]}", "name": "PRIYA NAIR",
+        "date_of_birth": "02/01/1985", "gender": "Female",
+    }
+
+
+def test_aadhaar_rejects_bad_checksum_and_vid():
+    number = _aadhaar()
+    wrong = number[:-1] + str((int(number[-1]) + 1) % 10)
+    assert "aadhar_no" not in extract_fields(_lines(wrong), "ind_aadhaar", 0.9)
+    # A 16-digit VID must not yield an Aadhaar number from its digits
+    assert "aadhar_no" not in extract_fields(_lines(f"VID: {number}1234"), "ind_aadhaar", 0.9)
+
+
+def test_voter_id():
+    lines = _lines("ELECTION COMMISSION OF INDIA", "ABC1234567", "Name: AMIT DESAI",
+                   "Father's Name: VIJAY DESAI", "Sex: Male")
+    assert extract_fields(lines, "ind_voterid", 0.9) == {
+        "voter_id": "ABC1234567", "name": "AMIT DESAI", "fathers_name": "VIJAY DESAI", "gender": "Male",
+    }
+
+
+def test_low_confidence_lines_are_dropped():
+    lines = [("ABCPS1234K", 0.5), ("Name", 0.99), ("RAHUL KUMAR SHARMA", 0.99)]
+    fields = extract_fields(lines, "ind_pan", 0.9)
+    assert "pan_no" not in fields
+    assert fields["name"] == "RAHUL KUMAR SHARMA"
+
+
+def test_unknown_doc_type():
+    assert extract_fields(_lines("ABCPS1234K"), "payslip", 0.9) == {}
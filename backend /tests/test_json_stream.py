@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from app.services.json_stream import JSONFieldStream
+
+OBJECTS = [
+    {"name": "RAHUL KUMAR SHARMA", "age": 34, "pan_no": "ABCPS1234K"},
+    {"address": {"line": "12, MG Road", "pin": "560001"}, "phones": ["1", "2"], "ok": True, "none": None},
+    {"quote": 'he said "hi, {there}"', "slash": "a\\b", "brackets": "[ ] { } ,"},
+    {"unicode": "नमस्ते", "float": 1.5e3, "empty": ""},
+    {"nested": [[1, [2, {"x": [3]}]], {"y": {}}], "last": []},
+]
+
+
+def _stream(text: str, size: int):
+    stream = JSONFieldStream()
+    fields = []
+    for i in range(0, len(text), size):
+        fields.extend(stream.feed(text[i:i + size]))
+    return stream, fields
+
+
+@pytest.mark.parametrize("obj", OBJECTS)
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_fields_match_json_loads(obj, size):
+    for text in (json.dumps(obj), json.dumps(obj, indent=2), json.dumps(obj, ensure_ascii=False)):
+        stream, fields = _stream(text, size)
+        assert fields == list(json.loads(text).items())
+        assert stream.done
+
+
+def test_fields_arrive_before_the_object_closes():
+    stream = JSONFieldStream()
+    assert stream.feed('{"name": "A", "pan_no": "AB') == [("name", "A")]
+    assert stream.feed('CPS1234K", "age": 3') == [("pan_no", "ABCPS1234K")]
+    assert stream.feed("4}") == [("age", 34)]
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_fences_and_chatter_are_skipped(size):
+    text = 'Sure, here it is:\n```json\n{"name": "A", "age": 1}\n```\nDone.'
+    stream, fields = _stream(text, size)
+    assert fields == [("name", "A"), ("age", 1)]
+    assert stream.feed('{"more": 1}') == []
+    # However the chunks fell, the final parse sees just the object
+    assert stream.text() == '{"name": "A", "age": 1}'
+
+
+def test_text_before_the_object_closes():
+    stream = JSONFieldStream()
+    stream.feed('```json\n{"name": "A", ')
+    assert stream.text() == '```json\n{"name": "A", '
+
+
+def test_top_level_array_streams_nothing():
+    stream, fields = _stream('[{"a": 1}]', 1)
+    assert fields == []
+    assert stream.done
+
+
+def test_malformed_pair_is_skipped():
+    _, fields = _stream('{"a": 1, "b": nope, "c": 3}', 2)
+    assert fields == [("a", 1), ("c", 3)]
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import llm_limiter
+from app.services.llm_limiter import BackendLimiter, LLMRateLimited, TokenBucket, estimate_tokens, send_limited
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refills_per_minute(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_limiter.time, "monotonic", clock)
+    bucket = TokenBucket(60)
+    assert bucket.deficit(60) == 0
+    bucket.take(60)
+    assert bucket.deficit(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.deficit(1) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.deficit(1) == 0
+    # Requests larger than the whole budget wait for a full bucket, not forever
+    assert bucket.deficit(1000) == pytest.approx(59.0)
+
+
+def test_unlimited_bucket():
+    bucket = TokenBucket(0)
+    bucket.take(10 ** 9)
+    assert bucket.deficit(10 ** 9) == 0
+
+
+def test_in_flight_cap():
+    limiter = BackendLimiter("test", max_in_flight=2, requests_per_minute=0, tokens_per_minute=0)
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with limiter.slot(10):
+            with lock:
+                peak.append(limiter.in_flight)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) == 2
+    stats = limiter.stats()
+    assert stats["acquired"] == 8
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_slots_are_first_come_first_served():
+    limiter = BackendLimiter("test", max_in_flight=1, requests_per_minute=0, tokens_per_minute=0)
+    order = []
+    holder = limiter.slot(1)
+    holder.__enter__()
+
+    def work(i):
+        with limiter.slot(1):
+            order.append(i)
+
+    threads = []
+    for i in range(5):
+        t = threading.Thread(target=work, args=(i,))
+        t.start()
+        threads.append(t)
+        # Let each thread take its ticket before the next one starts
+        while limiter.stats()["queue_depth"] < i + 1:
+            time.sleep(0.001)
+    holder.__exit__(None, None, None)
+    for t in threads:
+        t.join()
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_estimate_tokens():
+    payload = {
+        "max_tokens": 100,
+        "messages": [{"role": "user", "content": [
+            {"type": "text", "text": "x" * 400},
+            {"type": "image_url", "image_url": {"url": "data:"}},
+        ]}],
+    }
+    assert estimate_tokens(payload) == 100 + 100 + 1000
+
+
+def _response(status: int, headers=None) -> httpx.Response:
+    return httpx.Response(status, headers=headers, text="body", request=httpx.Request("POST", "http://llm/"))
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(llm_limiter.time, "sleep", delays.append)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX", 2)
+    return delays
+
+
+def test_send_limited_retries_then_succeeds(no_sleep):
+    answers = iter([_response(503), _response(429, {"Retry-After": "7"}), _response(200)])
+    resp = send_limited("test-retry", {}, lambda: next(answers))
+    assert resp.status_code == 200
+    assert no_sleep[1] == 7
+    assert llm_limiter.get_limiter("test-retry").stats()["retries"] == 2
+
+
+def test_send_limited_raises_when_still_throttled(no_sleep):
+    with pytest.raises(LLMRateLimited) as raised:
+        send_limited("test-throttled", {}, lambda: _response(429, {"Retry-After": "3"}))
+    assert raised.value.retry_after == 3
+    assert len(no_sleep) == 2
+
+
+def test_send_limited_returns_other_errors(no_sleep):
+    assert send_limited("test-error", {}, lambda: _response(400)).status_code == 400
+    assert no_sleep == []
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.services import pdf_text
+from app.services.pdf_text import _budget, _join, extract_text, page_selection
+from benchmarks.fixtures import text_pdf
+
+
+def test_budget_when_everything_fits():
+    assert _budget([10, 20, 5], 100) == 20
+    assert _budget([], 100) == 0
+
+
+def test_budget_gives_short_pages_their_full_text():
+    # The 10-char page keeps everything, the rest split what is left
+    assert _budget([10, 100, 100], 110) == 50
+    assert _budget([100, 100], 0) == 0
+
+
+def test_budget_never_exceeds_max_chars():
+    rng = random.Random(7)
+    for _ in range(500):
+        lengths = [rng.randrange(0, 500) for _ in range(rng.randrange(1, 12))]
+        max_chars = rng.randrange(0, 3000)
+        cap = _budget(lengths, max_chars)
+        assert sum(min(length, cap) for length in lengths) <= max_chars
+        # ...and leaves no more than one character per page unused
+        if sum(lengths) > max_chars:
+            assert sum(min(length, cap + 1) for length in lengths) > max_chars - len(lengths)
+
+
+def test_join_marks_gaps_and_tail():
+    text = _join([(0, "first"), (3, "fourth")], 6, 10_000)
+    assert text == "first\n[... pages 2-3 omitted ...]\nfourth\n[... pages 5-6 omitted ...]\n"
+
+
+def test_join_skips_blank_pages_without_a_marker():
+    assert _join([(0, "first"), (1, ""), (2, "third")], 3, 10_000) == "first\nthird\n"
+
+
+def test_join_truncates_long_pages():
+    pages = [(0, "a" * 10), (1, "b" * 1000)]
+    max_chars = 200 + pdf_text._MARKER_CHARS * 2
+    text = _join(pages, 2, max_chars)
+    assert text.startswith("a" * 10 + "\n" + "b" * 190 + "\n[... page 2 truncated ...]")
+    assert len(text) <= max_chars
+
+
+def test_page_selection():
+    assert page_selection("form16", 3) == [0, 1, 2]
+    assert page_selection("form16", 10) == [0, 1, 2, 3]
+    assert page_selection("financial_statement", 20) == [0, 1, 2, 3, 4, 17, 18, 19]
+
+
+@pytest.mark.parametrize("doc_type,engine", [("form16", "pdfium"), ("payslip", "pdfplumber")])
+def test_extract_text(doc_type, engine):
+    result = extract_text(text_pdf(10), doc_type)
+    assert result.engine == engine
+    assert result.page_count == 10
+    assert result.scanned_pages == []
+    assert "PAN: ABCPS1234K" in result.text
+    if doc_type == "form16":
+        assert result.text_pages == [1, 2, 3, 4]
+        assert result.text.endswith("[... pages 5-10 omitted ...]\n")
+
+
+def test_extract_text_falls_back_to_pdfplumber(monkeypatch, capsys):
+    def missing(file_bytes, select):
+        raise ImportError("No module named 'pypdfium2'")
+
+    monkeypatch.setitem(pdf_text._EXTRACTORS, "pdfium", missing)
+    monkeypatch.setattr(pdf_text, "_unavailable", set())
+    monkeypatch.setattr(settings, "OCR_PDF_TEXT_ENGINE", "pdfium")
+    data = text_pdf(2)
+    assert extract_text(data, "form16").engine == "pdfplumber"
+    assert extract_text(data, "form16").engine == "pdfplumber"
+    assert capsys.readouterr().out.count("unavailable") == 1
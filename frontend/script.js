@@ -18,6 +18,10 @@ const API_CONFIG = {
         pan: '/api/v1/ocr/upload/pan',
         aadhaar: '/api/v1/ocr/upload/ind_aadhaar',
         voterid: '/api/v1/ocr/upload/voterid',
+        // Streaming (Server-Sent Events) endpoints
+        panStream: '/api/v1/ocr/stream/pan',
+        aadhaarStream: '/api/v1/ocr/stream/ind_aadhaar',
+        voteridStream: '/api/v1/ocr/stream/voterid',
         processAll: '/api/ocr/process-all'
     }
 };
@@ -263,94 +267,113 @@ function removeFile(inputId, previewId) {
 // ========================================
 // OCR Integration Functions
 // ========================================
-async function extractPANData(file) {
-    try {
-        showOCRLoading('pan');
-
-        const uploadFormData = new FormData();
-        uploadFormData.append('file', file);
+// Streams fields into the result card as the backend extracts them.
+// Resolves with the final data, false if extraction failed, or null if
+// streaming is unavailable.
+async function streamOCRData(docType, file) {
+    if (!window.ReadableStream || !window.TextDecoder) return null;
+
+    const uploadFormData = new FormData();
+    uploadFormData.append('file', file);
+
+    const response = await fetch(`${API_CONFIG.baseURL}${API_CONFIG.endpoints[`${docType}Stream`]}`, {
+        method: 'POST',
+        body: uploadFormData
+    });
 
-        const response = await fetch(`${API_CONFIG.baseURL}${API_CONFIG.endpoints.pan}`, {
-            method: 'POST',
-            body: uploadFormData
-        });
+    if (!response.ok || !response.body) {
+        return null;
+    }
 
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const partial = {};
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (!data) continue;
+            const payload = JSON.parse(data);
+
+            if (event === 'field') {
+                partial[payload.field] = payload.value;
+                displayOCRResult(docType, partial);
+            } else if (event === 'done') {
+                reader.cancel();
+                return payload.data;
+            } else if (event === 'error') {
+                // Extraction failed; retrying via the upload endpoint would not help
+                reader.cancel();
+                return false;
+            }
         }
+    }
+    throw new Error('Extraction stream ended unexpectedly');
+}
 
-        const result = await response.json();
+async function uploadOCRData(docType, file) {
+    const uploadFormData = new FormData();
+    uploadFormData.append('file', file);
 
-        if (result.success) {
-            formData.ocrResults.pan = result.data;
-            displayOCRResult('pan', result.data);
-        } else {
-            showOCRError('pan', 'Failed to extract PAN data');
-        }
-    } catch (error) {
-        console.error('PAN extraction error:', error);
-        showOCRError('pan', error.message);
+    const response = await fetch(`${API_CONFIG.baseURL}${API_CONFIG.endpoints[docType]}`, {
+        method: 'POST',
+        body: uploadFormData
+    });
+
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
     }
+
+    const result = await response.json();
+    return result.success ? result.data : null;
 }
 
-async function extractAadhaarData(file) {
+async function extractOCRData(docType, file, label) {
     try {
-        showOCRLoading('aadhaar');
-
-        const uploadFormData = new FormData();
-        uploadFormData.append('file', file);
-
-        const response = await fetch(`${API_CONFIG.baseURL}${API_CONFIG.endpoints.aadhaar}`, {
-            method: 'POST',
-            body: uploadFormData
-        });
+        showOCRLoading(docType);
 
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+        let data = await streamOCRData(docType, file);
+        if (data === null) {
+            data = await uploadOCRData(docType, file);
         }
 
-        const result = await response.json();
-
-        if (result.success) {
-            formData.ocrResults.aadhaar = result.data;
-            displayOCRResult('aadhaar', result.data);
+        if (data) {
+            formData.ocrResults[docType] = data;
+            displayOCRResult(docType, data);
         } else {
-            showOCRError('aadhaar', 'Failed to extract Aadhaar data');
+            showOCRError(docType, `Failed to extract ${label} data`);
         }
     } catch (error) {
-        console.error('Aadhaar extraction error:', error);
-        showOCRError('aadhaar', error.message);
+        console.error(`${label} extraction error:`, error);
+        showOCRError(docType, error.message);
     }
 }
 
-async function extractVoterIDData(file) {
-    try {
-        showOCRLoading('voterid');
-
-        const uploadFormData = new FormData();
-        uploadFormData.append('file', file);
-
-        const response = await fetch(`${API_CONFIG.baseURL}${API_CONFIG.endpoints.voterid}`, {
-            method: 'POST',
-            body: uploadFormData
-        });
-
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
+async function extractPANData(file) {
+    await extractOCRData('pan', file, 'PAN');
+}
 
-        const result = await response.json();
+async function extractAadhaarData(file) {
+    await extractOCRData('aadhaar', file, 'Aadhaar');
+}
 
-        if (result.success) {
-            formData.ocrResults.voterid = result.data;
-            displayOCRResult('voterid', result.data);
-        } else {
-            showOCRError('voterid', 'Failed to extract voter ID data');
-        }
-    } catch (error) {
-        console.error('Voter ID extraction error:', error);
-        showOCRError('voterid', error.message);
-    }
+async function extractVoterIDData(file) {
+    await extractOCRData('voterid', file, 'voter ID');
 }
 
 function showOCRLoading(docType) {